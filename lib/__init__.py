@@ -4,6 +4,7 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
+from capabilities import *
 from common import *
 from framereader import *
 from metrics import *
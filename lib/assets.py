@@ -0,0 +1,177 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import slash
+import subprocess
+import tarfile
+
+from capabilities import get_cache_dir, which
+from common import atomic_write
+
+# The assets tarball is extracted lazily.  An index of its members is built
+# once (and cached on disk, keyed on the tarball identity) and only the members
+# referenced by the test specs that are actually executed get extracted: those
+# of all selected tests in one pass at load time (see
+# MediaPlugin._prefetch_assets), any others on first access.  bzip2 is not seekable, so an extraction still has to
+# decompress the stream up to the last requested member; it stops there and
+# uses a parallel bzip2 decompressor when one is installed.
+
+class Assets:
+  # parallel bzip2 decompressors, in order of preference
+  DECOMPRESSORS = ["lbzip2", "pbzip2"]
+
+  def __init__(self, tarball, root):
+    self.tarball = tarball
+    self.root = root
+    self.__index = None
+
+  def __decompress(self):
+    with open(self.tarball, "rb") as fd:
+      magic = fd.read(3)
+
+    if "BZh" == magic:
+      for program in self.DECOMPRESSORS:
+        binary = which(program)
+        if binary is not None:
+          proc = subprocess.Popen(
+            [binary, "-dc", self.tarball], stdout = subprocess.PIPE)
+          return proc, lambda: tarfile.open(
+            fileobj = proc.stdout, mode = "r|")
+
+    return None, lambda: tarfile.open(self.tarball, mode = "r|*")
+
+  def __members(self):
+    proc, opener = self.__decompress()
+    tf = None
+    try:
+      tf = opener()
+      for member in tf:
+        yield tf, os.path.normpath(member.name), member
+    except tarfile.ReadError, e:
+      assert 0, ("Failed to read assets.  Did you forget to"
+        " initialize git lfs (see README.md)?")
+    finally:
+      if tf is not None:
+        tf.close()
+      if proc is not None:
+        proc.stdout.close()
+        if proc.poll() is None:
+          proc.kill()
+        proc.wait()
+
+  def __lock(self):
+    if not os.path.exists(self.root):
+      os.makedirs(self.root)
+    lockfile = os.path.join(self.root, ".lock")
+    fd = open(lockfile, "a")
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    return fd
+
+  @property
+  def index(self):
+    if self.__index is not None:
+      return self.__index
+
+    stat = os.stat(self.tarball)
+    key = [os.path.realpath(self.tarball), stat.st_size, stat.st_mtime]
+    filename = os.path.join(get_cache_dir(), "assets", "{}.json".format(
+      hashlib.sha1(json.dumps(key)).hexdigest()))
+
+    try:
+      with open(filename, "rb") as fd:
+        self.__index = json.load(fd)
+        return self.__index
+    except (IOError, OSError, ValueError):
+      pass
+
+    self.__index = dict()
+    for tf, name, member in self.__members():
+      if member.isfile():
+        self.__index[name] = member.size
+
+    try:
+      if not os.path.exists(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+      with atomic_write(filename) as fd:
+        json.dump(self.__index, fd)
+    except (IOError, OSError):
+      pass # a read-only cache is not fatal
+
+    return self.__index
+
+  def __missing(self, names):
+    return set([
+      n for n in names if not os.path.exists(
+        os.path.join(os.path.dirname(self.root), n))])
+
+  def extract(self, names):
+    # the index is only needed when something is not extracted yet
+    names = self.__missing(names)
+    if not len(names):
+      return
+    names.intersection_update(self.index.keys())
+    if not len(names):
+      return
+
+    # serialize extraction between parallel workers, then recheck what is
+    # still missing since another worker may have extracted it meanwhile
+    with self.__lock():
+      names = self.__missing(names)
+      if not len(names):
+        return
+
+      slash.logger.info("Extracting {} asset(s)...".format(len(names)))
+      members = self.__members()
+      for tf, name, member in members:
+        if name not in names:
+          continue
+
+        dest = os.path.join(os.path.dirname(self.root), name)
+        if not os.path.exists(os.path.dirname(dest)):
+          os.makedirs(os.path.dirname(dest))
+        with atomic_write(dest) as fd:
+          shutil.copyfileobj(tf.extractfile(member), fd)
+          os.fchmod(fd.fileno(), member.mode)
+
+        names.remove(name)
+        if not len(names):
+          members.close() # stop decompressing
+          break
+
+  def require(self, value):
+    # collect all asset paths referenced by value (i.e. a test spec entry)
+    prefix = os.path.join(self.root, "")
+    names = list()
+    def walk(v):
+      if isinstance(v, basestring):
+        if v.startswith(prefix):
+          names.append(os.path.relpath(v, os.path.dirname(self.root)))
+      elif isinstance(v, dict):
+        map(walk, v.values())
+      elif isinstance(v, (list, tuple)):
+        map(walk, v)
+    walk(value)
+
+    if len(names):
+      self.extract(names)
+
+class TestSpec(dict):
+  # Test spec whose case entries are announced to the media plugin when the
+  # running test looks them up (i.e. spec[case]).  That is where the assets,
+  # resolution and frame count of the test become known (see
+  # MediaPlugin._use_test_spec).
+  def __getitem__(self, case):
+    from common import get_media
+    value = dict.__getitem__(self, case)
+    use = getattr(get_media(), "_use_test_spec", None)
+    if use is not None:
+      use(value)
+    return value
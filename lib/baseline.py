@@ -6,26 +6,49 @@
 
 import json
 import os
+import shutil
 import slash
-from common import get_media
+from common import atomic_write, get_media, get_session_pid
 
-################################################
-# FIXME: Make Baseline work in parallel mode ###
-################################################
+# In parallel mode, each worker writes the references/actuals of the tests it
+# ran to a shard file (see finalize).  The parent merges the shards, in worker
+# order, before writing the rebased baseline.  A test address with different
+# values in different shards is a conflict: it is reported and keeps its
+# previous reference.
+#
+# The per-frame md5 checksums of md5 references (see check_md5) are kept in a
+# sidecar file ("<baseline>.frames"), so that they do not bloat the baseline
+# itself.
 
 class Baseline:
+  # allowed relative increase of the p50, p95, p99 and max frame latency (see
+  # check_latency), the tail is noisier than the median
+  LATENCY_THRESHOLDS = [0.1, 0.25, 0.5, 1.0]
+  # absolute slack in ms, for timer and scheduling jitter of short latencies
+  LATENCY_SLACK = 0.5
+
   def __init__(self, filename, rebase = False):
     self.filename = filename
     self.references = dict()
+    self.frames = dict()
     self.actuals = dict()
     self.rebase = rebase
+    self.touched = set()
 
     if self.filename and os.path.exists(self.filename):
       with open(self.filename, "rb") as fd:
         self.references = json.load(fd)
+    if self.filename and os.path.exists(self.__frames_file()):
+      with open(self.__frames_file(), "rb") as fd:
+        self.frames = json.load(fd)
+
+  def __frames_file(self):
+    return "{}.frames".format(self.filename)
 
-  def __get_reference(self, addr, context = []):
-    reference = self.references.setdefault(addr, dict())
+  def __get_reference(self, addr, context = [], references = None):
+    if references is None:
+      references = self.references
+    reference = references.setdefault(addr, dict())
     for c in get_media()._expand_context(context):
       reference = reference.setdefault(c, dict())
     return reference
@@ -33,6 +56,7 @@ class Baseline:
   def check_result(self, compare, context = [], **kwargs):
     addr = slash.context.test.__slash__.address
     actual = self.actuals.setdefault(addr, dict())
+    self.touched.add(addr)
     reference = self.__get_reference(addr, context)
 
     actual.update(**kwargs)
@@ -54,12 +78,120 @@ class Baseline:
       assert all(map(lambda r,a: a+0.2 > r, ref[3:], actual[3:]))
     self.check_result(compare, context, psnr = map(lambda v: round(v, 4), psnr))
 
-  def check_md5(self, md5, context = []):
+  def check_md5(self, md5, context = [], frames = None):
+    addr = slash.context.test.__slash__.address
+    refframes = None
+    if addr in self.frames:
+      refframes = self.__get_reference(addr, context, self.frames).get("md5")
+
+    # per-frame checksums are kept in the sidecar so that a mismatch can name
+    # the first diverging frame
+    if self.rebase and frames is not None:
+      self.__get_reference(addr, context, self.frames).update(md5 = frames)
+
     def compare(k, ref, actual):
+      if ref != actual and refframes is not None and frames is not None:
+        diverged = [
+          n for n, (r, a) in enumerate(zip(refframes, frames)) if r != a]
+        if len(refframes) != len(frames):
+          diverged.append(min(len(refframes), len(frames)))
+        assert not len(diverged), (
+          "md5 mismatch, first diverging frame: {}".format(diverged[0]))
       assert ref == actual
     self.check_result(compare, context, md5 = md5)
 
+  # Throughput may vary a bit between runs, so fps only fails when it drops
+  # more than tolerance (relative, default: --perf-tolerance) below the
+  # reference.
+  def check_perf(self, fps, context = [], tolerance = None):
+    if tolerance is None:
+      tolerance = get_media().perf_tolerance
+    def compare(k, ref, actual):
+      assert ref is not None, "Invalid reference value"
+      assert actual >= ref * (1.0 - tolerance), (
+        "fps regression: {} < {} - {:.0%}".format(actual, ref, tolerance))
+    self.check_result(compare, context, fps = round(fps, 2))
+
+  def check_density(self, channels, context = []):
+    def compare(k, ref, actual):
+      assert ref is not None, "Invalid reference value"
+      assert actual >= ref, (
+        "density regression: {} < {} channels".format(actual, ref))
+    self.check_result(compare, context, density = channels)
+
+  # latency = [p50, p95, p99, max] frame latency in ms, stored as key (i.e.
+  # "calltime" for the per-call times of ffmpeg, see check_metric)
+  def check_latency(self, latency, context = [], thresholds = None, key = "latency"):
+    thresholds = thresholds or self.LATENCY_THRESHOLDS
+    def compare(k, ref, actual):
+      assert ref is not None, "Invalid reference value"
+      for name, r, a, t in zip(["p50", "p95", "p99", "max"], ref, actual, thresholds):
+        assert a <= r * (1.0 + t) + self.LATENCY_SLACK, (
+          "{} {} regression: {}ms > {}ms + {:.0%}".format(name, k, a, r, t))
+    self.check_result(
+      compare, context, **{key : map(lambda v: round(v, 3), latency)})
+
+  def __shard_dir(self, pid):
+    return "{}.shards.{}".format(self.filename, pid)
+
+  def __write_shard(self, worker):
+    shards = self.__shard_dir(get_session_pid())
+    if not os.path.exists(shards):
+      try:
+        os.makedirs(shards)
+      except OSError:
+        pass # created by another worker
+
+    shard = dict(
+      references = dict(
+        (a, self.references[a]) for a in self.touched) if self.rebase else {},
+      frames = dict(
+        (a, self.frames[a]) for a in self.touched
+          if a in self.frames) if self.rebase else {},
+      actuals = dict((a, self.actuals[a]) for a in self.touched),
+    )
+
+    filename = os.path.join(shards, "{}.json".format(worker))
+    with atomic_write(filename) as fd:
+      json.dump(shard, fd)
+
+  def __merge_shards(self):
+    shards = self.__shard_dir(get_session_pid())
+    if not os.path.exists(shards):
+      return
+
+    merged = dict(references = dict(), frames = dict(), actuals = dict())
+    conflicts = set()
+    for name in sorted(os.listdir(shards)):
+      if not name.endswith(".json"):
+        continue
+      with open(os.path.join(shards, name), "rb") as fd:
+        shard = json.load(fd)
+      for key in merged.keys():
+        for addr, value in shard.get(key, dict()).items():
+          if merged[key].setdefault(addr, value) != value:
+            conflicts.add(addr)
+
+    for addr in sorted(conflicts):
+      slash.logger.error(
+        "baseline conflict: {} has different results in different workers,"
+        " keeping previous reference".format(addr))
+      merged["references"].pop(addr, None)
+      merged["frames"].pop(addr, None)
+
+    self.references.update(merged["references"])
+    self.frames.update(merged["frames"])
+    self.actuals.update(merged["actuals"])
+    shutil.rmtree(shards)
+
   def finalize(self):
+    worker = slash.config.root.parallel.worker_id
+    if worker is not None:
+      self.__write_shard(worker)
+      return
+
+    self.__merge_shards()
+
     if self.rebase:
       if not os.path.exists(os.path.dirname(self.filename)):
         os.makedirs(os.path.dirname(self.filename))
@@ -68,4 +200,6 @@ class Baseline:
         json.encoder.FLOAT_REPR = lambda f: "{:.4f}".format(f)
         json.dump(self.references, fd, indent = 2, sort_keys = True)
         json.encoder.FLOAT_REPR = rep
-
+      if len(self.frames):
+        with open(self.__frames_file(), "wb+") as fd:
+          json.dump(self.frames, fd, sort_keys = True, separators = (',', ':'))
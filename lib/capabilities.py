@@ -0,0 +1,166 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+
+from common import atomic_write
+
+# Capability probes (e.g. have_gst_element) used to fork one gst-inspect-1.0 or
+# ffmpeg pipeline per queried name, in every process.  Instead, each tool is
+# queried once for its complete listing (gst-inspect-1.0 features and plugins,
+# ffmpeg encoders, decoders, filters and hwaccels) and the parsed names are
+# indexed in sets and cached on disk, shared by all sessions and parallel
+# workers.  Every have_* predicate is then a set lookup.  A cached listing is
+# only reused while the tool binary (path and mtime), the environment that
+# affects what it can load and the shared objects it loads (gstreamer plugins
+# and registry, ffmpeg libraries, va drivers) are unchanged.
+#
+# The cache location can be set with the VAAPI_FITS_CACHE_DIR environment
+# variable (the probes run at test load time, before any command-line options
+# are parsed).
+
+__listings = dict()
+
+# environment variables that change what the tools report
+ENVIRONMENT = [
+  "LIBVA_DRIVER_NAME", "LIBVA_DRIVERS_PATH", "LD_LIBRARY_PATH",
+  "GST_PLUGIN_PATH", "GST_PLUGIN_SYSTEM_PATH",
+]
+
+# default library locations, the environment may add others
+LIB_PATHS = [
+  "/usr/lib/x86_64-linux-gnu", "/usr/lib64", "/usr/lib", "/usr/local/lib",
+  "/usr/local/lib64", "/usr/local/lib/x86_64-linux-gnu",
+]
+DRIVER_PATHS = [os.path.join(p, "dri") for p in LIB_PATHS]
+GST_PLUGIN_PATHS = [os.path.join(p, "gstreamer-1.0") for p in LIB_PATHS]
+
+def get_cache_dir():
+  return os.environ.get("VAAPI_FITS_CACHE_DIR", None) or os.path.join(
+    os.environ.get("XDG_CACHE_HOME", None) or os.path.expanduser("~/.cache"),
+    "vaapi-fits")
+
+def which(program):
+  for path in os.environ.get("PATH", "").split(os.pathsep):
+    filename = os.path.join(path, program)
+    if os.path.isfile(filename) and os.access(filename, os.X_OK):
+      return filename
+  return None
+
+def get_mtime(filename):
+  if filename is None or not os.path.exists(filename):
+    return None
+  return os.stat(filename).st_mtime
+
+def __env_paths(variable):
+  return [p for p in os.environ.get(variable, "").split(':') if len(p)]
+
+def get_driver_paths():
+  return __env_paths("LIBVA_DRIVERS_PATH") or DRIVER_PATHS
+
+def get_gst_plugin_paths():
+  return __env_paths("GST_PLUGIN_PATH") + (
+    __env_paths("GST_PLUGIN_SYSTEM_PATH") or GST_PLUGIN_PATHS)
+
+def get_gst_registry():
+  return [get_mtime(f) for f in sorted(glob.glob(os.path.expanduser(
+    "~/.cache/gstreamer-1.0/registry.*.bin")))]
+
+def __newest(paths, pattern):
+  mtimes = [
+    get_mtime(f) for p in paths for f in glob.glob(os.path.join(p, pattern))]
+  return max(mtimes) if len(mtimes) else None
+
+def get_dependencies(program):
+  # mtimes of the newest shared objects that program loads (plugins,
+  # libraries, va drivers)
+  deps = [__newest(get_driver_paths(), "*_drv_video.so")]
+  if program.startswith("gst-"):
+    deps.append(__newest(get_gst_plugin_paths(), "*.so"))
+    deps.extend(get_gst_registry())
+  else:
+    deps.append(__newest(
+      __env_paths("LD_LIBRARY_PATH") + LIB_PATHS, "libav*.so*"))
+  return deps
+
+def __parse_gst_inspect(output):
+  # "plugin:  feature: description", both plugins and features can be probed
+  names = set()
+  for m in re.finditer("^([^\s:]+):\s+([^\s:]+):", output, re.MULTILINE):
+    names.update(m.groups())
+  return names
+
+def __parse_ffmpeg_listing(output):
+  # " V..... name    description", same field the awk '{print $2}' probes used
+  names = set()
+  for line in output.split('\n'):
+    fields = line.split()
+    if len(fields) > 1:
+      names.add(fields[1])
+  return names
+
+def __parse_ffmpeg_hwaccels(output):
+  # "Hardware acceleration methods:" followed by one method per line
+  return set(l.strip() for l in output.split('\n')[1:] if len(l.strip()))
+
+def __load(program, args, parse):
+  binary = which(program)
+  if binary is None:
+    return set()
+
+  key = [binary, os.stat(binary).st_mtime, args] + [
+    os.environ.get(e, None) for e in ENVIRONMENT] + get_dependencies(program)
+  filename = os.path.join(get_cache_dir(), "capabilities", "{}-{}.json".format(
+    program, hashlib.sha1(json.dumps(key)).hexdigest()))
+
+  try:
+    with open(filename, "rb") as fd:
+      return set(json.load(fd))
+  except (IOError, OSError, ValueError):
+    pass
+
+  try:
+    output = subprocess.check_output(
+      "{} {}".format(binary, args), stderr = subprocess.STDOUT, shell = True)
+  except:
+    return set() # do not cache failures
+
+  names = parse(output)
+
+  try:
+    if not os.path.exists(os.path.dirname(filename)):
+      os.makedirs(os.path.dirname(filename))
+    with atomic_write(filename) as fd:
+      json.dump(sorted(names), fd)
+  except (IOError, OSError):
+    pass # a read-only cache is not fatal
+
+  return names
+
+def __listing(program, args, parse):
+  if (program, args) not in __listings:
+    __listings[(program, args)] = __load(program, args, parse)
+  return __listings[(program, args)]
+
+def gst_features():
+  return __listing("gst-inspect-1.0", "", __parse_gst_inspect)
+
+def ffmpeg_encoders():
+  return __listing("ffmpeg", "-hide_banner -encoders", __parse_ffmpeg_listing)
+
+def ffmpeg_decoders():
+  return __listing("ffmpeg", "-hide_banner -decoders", __parse_ffmpeg_listing)
+
+def ffmpeg_filters():
+  return __listing("ffmpeg", "-hide_banner -filters", __parse_ffmpeg_listing)
+
+def ffmpeg_hwaccels():
+  return __listing("ffmpeg", "-hide_banner -hwaccels", __parse_ffmpeg_hwaccels)
@@ -4,10 +4,14 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
+import contextlib
+import ctypes
+import multiprocessing
 import os
+import select
 import slash
 import subprocess
-import threading
+import sys
 import time
 
 class memoize:
@@ -30,6 +34,55 @@ class memoize:
 def get_media():
   return slash.plugins.manager.get_plugin("media")
 
+# The temporary file of this process to produce filename in (see atomic_write)
+def get_temporary_name(filename):
+  return "{}.{}.tmp".format(filename, os.getpid())
+
+# Open filename for writing, atomically: the data goes to a temporary file that
+# replaces filename when the block completes.  Concurrent readers (i.e. other
+# workers or sessions) never see a partial file, and an interrupted write
+# leaves no truncated file behind.
+@contextlib.contextmanager
+def atomic_write(filename, mode = "wb"):
+  tmp = get_temporary_name(filename)
+  try:
+    with open(tmp, mode) as fd:
+      yield fd
+    os.rename(tmp, filename)
+  finally:
+    if os.path.exists(tmp):
+      os.remove(tmp)
+
+class __timespec(ctypes.Structure):
+  _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+__clock_gettime = ctypes.CDLL(None, use_errno = True).clock_gettime
+__clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(__timespec)]
+
+# CLOCK_MONOTONIC in microseconds, the clock of the kernel log timestamps
+def monotonic():
+  t = __timespec()
+  if __clock_gettime(1, ctypes.byref(t)) != 0:
+    e = ctypes.get_errno()
+    raise OSError(e, os.strerror(e))
+  return t.tv_sec * 1000000 + t.tv_nsec / 1000
+
+# The pid of the process that runs the session.  Parallel workers are children
+# of the parent session process.
+def get_session_pid():
+  if slash.config.root.parallel.worker_id is not None:
+    return os.getppid()
+  return os.getpid()
+
+# Benchmarks (i.e. perf, latency, calltime and density tests) are tagged
+# "benchmark" and only run with --benchmarks.  Their baselines are specific to
+# the system under test and they need an otherwise idle GPU.
+def have_benchmarks():
+  return get_media().benchmarks
+
+def benchmark(cls):
+  return slash.tag("benchmark")(slash.requires(have_benchmarks)(cls))
+
 def killproc(proc):
   result = proc.poll()
   if result is not None:
@@ -57,74 +110,324 @@ def killproc(proc):
 
   return result
 
+class CallLoop:
+  # One selector loop, shared by all calls of this process, multiplexes the
+  # output pipes and timeouts of every running call.  No helper threads are
+  # needed and several calls (see call_async) can run concurrently.  The loop
+  # only runs while some caller waits on a call.
+  def __init__(self):
+    self.poller = select.poll()
+    self.pipes = dict()
+    self.calls = set()
+
+  def add(self, call):
+    self.calls.add(call)
+    for fd, handler in call.pipes.items():
+      self.poller.register(fd, select.POLLIN | select.POLLPRI)
+      self.pipes[fd] = (call, handler)
+
+  def discard(self, fd):
+    if fd in self.pipes:
+      self.poller.unregister(fd)
+      del self.pipes[fd]
+
+  def run(self, until):
+    try:
+      while not until():
+        now = time.time()
+        wakeup = min([c.wakeup(now) for c in self.calls] + [now + 1.0])
+        events = self.poller.poll(max(0, int((wakeup - now) * 1000)))
+
+        for fd, event in events:
+          if fd not in self.pipes:
+            continue
+          call, handler = self.pipes[fd]
+          data = os.read(fd, 65536)
+          if len(data):
+            call.dispatch(handler, data)
+          else:
+            call.eof(fd)
+
+        now = time.time()
+        for call in list(self.calls):
+          if call.tick(now):
+            self.calls.remove(call)
+    except:
+      # in case of user interrupt
+      for call in list(self.calls):
+        call.abort()
+      self.calls.clear()
+      raise
+
+@memoize
+def get_call_loop():
+  return CallLoop()
+
+class Call:
+  # grace period for closing the pipes after the process exited (i.e. when a
+  # background child inherited them)
+  LINGER = 30
+
+  def __init__(self, command, withSlashLogger = True, consumer = None, fd = 1):
+    calls_allowed = get_media()._calls_allowed()
+    assert calls_allowed, "call refused"
+
+    if withSlashLogger:
+      self.logger = slash.logger.info
+    else:
+      self.logger = lambda x: None
+
+    self.consumer = consumer
+    self.output = list()
+    self.partial = ""
+    self.frame = bytearray()
+    self.error = None
+    self.triggered = False
+    self.done = False
+    self.exited = None
+    self.abandoned = False
+
+    # When streaming, the child's stream output (fd) is redirected to the
+    # stdout pipe and everything the child writes to stdout/stderr is logged
+    # instead.
+    if consumer is not None and fd != 1:
+      command += " {}>&1 1>&2".format(fd)
+
+    # Without "exec", the shell will launch the "command" in a child process
+    # and proc.pid will represent the shell (not the "command").  And
+    # therefore, the "command" will not get killed with proc.terminate() or
+    # proc.kill().
+    #
+    # When we use "exec" to run the "command". This will cause the "command" to
+    # inherit the shell process and proc.pid will represent the actual
+    # "command".
+    self.begin = time.time()
+    self.proc = subprocess.Popen(
+      "exec " + command,
+      stdin = subprocess.PIPE,
+      stdout = subprocess.PIPE,
+      stderr = subprocess.STDOUT if consumer is None else subprocess.PIPE,
+      shell = True)
+
+    # resource usage of the call (see finish), reported to the media plugin
+    self.telemetry = dict(spawn = time.time() - self.begin)
+    self.rusage = None
+    self.nbytes = 0
+
+    self.logger("CALL: {} (pid: {})".format(command, self.proc.pid))
+    self.started = monotonic()
+
+    self.timeout = get_media()._get_call_timeout()
+    self.deadline = time.time() + self.timeout
+    self.killat = list()
+
+    if consumer is None:
+      self.pipes = {self.proc.stdout.fileno() : self.log}
+    else:
+      self.pipes = {
+        self.proc.stderr.fileno() : self.log,
+        self.proc.stdout.fileno() : self.stream,
+      }
+
+    get_call_loop().add(self)
+
+  def log(self, data):
+    self.output.append(data)
+    lines = (self.partial + data).split('\n')
+    self.partial = lines.pop()
+    for line in lines:
+      self.logger(line)
+
+  def stream(self, data):
+    self.frame.extend(data)
+    framesize = self.consumer.framesize
+    while len(self.frame) >= framesize:
+      self.consumer.write(bytes(self.frame[:framesize]))
+      del self.frame[:framesize]
+
+  def dispatch(self, handler, data):
+    self.nbytes += len(data)
+    self.deliver(handler, data)
+
+  def deliver(self, handler, data):
+    if self.error is not None:
+      return # drain and discard output after a consumer error
+    try:
+      handler(data)
+    except:
+      self.error = sys.exc_info()
+      self.terminate(time.time())
+
+  def eof(self, fd):
+    handler = self.pipes.pop(fd)
+    get_call_loop().discard(fd)
+    if self.log == handler and len(self.partial):
+      self.logger(self.partial)
+    if self.stream == handler and len(self.frame):
+      # the trailing partial frame, already counted when it was read
+      self.deliver(lambda data: self.consumer.write(data), bytes(self.frame))
+      del self.frame[:]
+
+  def terminate(self, now):
+    # 'gently' terminate first, then kill (see killproc)
+    if not len(self.killat) and self.reap() is None:
+      self.proc.terminate()
+      self.killat = [now + 5, now + 15]
+
+  def wakeup(self, now):
+    if self.exited is not None:
+      return self.exited + self.LINGER
+    if not len(self.pipes):
+      return now + 0.05 # pipes closed, process exit is imminent
+    if len(self.killat):
+      return self.killat[0]
+    return self.deadline
+
+  def reap(self):
+    # like proc.poll(), but also collects the resource usage of the child and
+    # the time it was reaped (i.e. its exit time)
+    if self.proc.returncode is None:
+      try:
+        pid, status, self.rusage = os.wait4(self.proc.pid, os.WNOHANG)
+      except OSError:
+        return self.proc.poll()
+      if 0 == pid:
+        return None
+      if os.WIFSIGNALED(status):
+        self.proc.returncode = -os.WTERMSIG(status)
+      else:
+        self.proc.returncode = os.WEXITSTATUS(status)
+      self.exited = time.time()
+    return self.proc.returncode
+
+  def tick(self, now):
+    if self.done:
+      return True # aborted
+
+    if self.exited is None and not self.abandoned:
+      if self.reap() is not None:
+        if self.exited is None: # reaped elsewhere (i.e. by proc.poll)
+          self.exited = now
+      elif len(self.killat):
+        if now >= self.killat[0]:
+          self.killat.pop(0)
+          if len(self.killat):
+            self.proc.kill()
+          else:
+            # failed to kill proc
+            slash.logger.warn(
+              'Failed to kill process with pid {}'.format(self.proc.pid))
+            self.abandoned = True
+      elif now >= self.deadline:
+        self.triggered = True
+        self.terminate(now)
+
+    if not self.abandoned:
+      if self.exited is None:
+        return False
+      if len(self.pipes) and now < self.exited + self.LINGER:
+        return False
+
+    self.finish()
+    return True
+
+  def finish(self):
+    for fd in self.pipes.keys():
+      get_call_loop().discard(fd)
+    self.pipes.clear()
+    for pipe in [self.proc.stdin, self.proc.stdout, self.proc.stderr]:
+      if pipe is not None:
+        pipe.close()
+    if self.consumer is not None:
+      self.consumer.close()
+    self.done = True
+
+    self.telemetry.update(
+      wall = (self.exited or time.time()) - self.begin, output = self.nbytes)
+    if self.rusage is not None:
+      self.telemetry.update(
+        user = self.rusage.ru_utime, sys = self.rusage.ru_stime,
+        maxrss = self.rusage.ru_maxrss)
+    self.ended = monotonic()
+    get_media()._report_call(self)
+
+  def abort(self):
+    if not self.done:
+      killproc(self.proc)
+      self.finish()
+
+  def wait(self):
+    get_call_loop().run(lambda: self.done)
+
+    if self.error is not None:
+      raise self.error[0], self.error[1], self.error[2]
+
+    error = False
+    message = ""
+
+    if self.triggered:
+      error = True
+      get_media()._report_call_timeout()
+      message = "CALL TIMEOUT: timeout after {} seconds (pid: {}).".format(
+        self.timeout, self.proc.pid)
+    elif self.proc.returncode != 0:
+      error = True
+      message = "CALL ERROR: failed with exitcode {} (pid: {})".format(
+        self.proc.returncode, self.proc.pid)
+
+    assert not error, message
+    return "".join(self.output)
+
 def call(command, withSlashLogger = True):
+  return Call(command, withSlashLogger).wait()
 
-  calls_allowed = get_media()._calls_allowed()
-  assert calls_allowed, "call refused"
-
-  if withSlashLogger:
-    logger = slash.logger.info
-  else:
-    logger = lambda x: None
-
-  def readproc(proc):
-    for line in iter(proc.stdout.readline, ''):
-      readproc.output += line
-      logger(line.rstrip('\n'))
-  readproc.output = ""
-
-  def timeout(proc):
-    timeout.triggered = proc.poll() is None
-    killproc(proc)
-  timeout.triggered = False
-
-  error = False
-  message = ""
-
-  # Without "exec", the shell will launch the "command" in a child process and
-  # proc.pid will represent the shell (not the "command").  And therefore, the
-  # "command" will not get killed with proc.terminate() or proc.kill().
-  #
-  # When we use "exec" to run the "command". This will cause the "command" to
-  # inherit the shell process and proc.pid will represent the actual "command".
-  proc = subprocess.Popen(
-    "exec " + command,
-    stdin = subprocess.PIPE,
-    stdout = subprocess.PIPE,
-    stderr = subprocess.STDOUT,
-    shell = True)
-
-  logger("CALL: {} (pid: {})".format(command, proc.pid))
-
-  reader = threading.Thread(target = readproc, args = [proc])
-  timer = threading.Timer(get_media()._get_call_timeout(), timeout, [proc])
-  reader.daemon = True
-  timer.daemon = True
-  reader.start()
-  timer.start()
-
-  try: # in case of user interrupt
-    proc.wait()
-    timer.cancel()
-  except:
-    killproc(proc)
-    raise
+# Like call(), but the raw video the command writes to file descriptor fd
+# (e.g. ffmpeg "-f rawvideo -" or gst "checksumsink2 dump-location=/dev/fd/3")
+# is handed to the consumer one frame (consumer.framesize bytes) at a time via
+# consumer.write().  The frames must be tightly packed (i.e. not fdsink, which
+# writes the padded rows of the gst buffers).  The consumer is closed when the
+# command ends.  Use an fd other than stdout for commands that print their log
+# to stdout (e.g. gst-launch-1.0).
+def call_stream(command, consumer, fd = 1, withSlashLogger = True):
+  return Call(command, withSlashLogger, consumer, fd).wait()
+
+# Start a call (see call/call_stream) without waiting for it.  The returned
+# Call runs concurrently with any other started call; Call.wait() returns its
+# output (or fails) like call() does.
+def call_async(command, consumer = None, fd = 1, withSlashLogger = True):
+  return Call(command, withSlashLogger, consumer, fd)
+
+# Run call_stream() for each (command, consumer) job with at most limit calls
+# (default: number of cpus) running concurrently.  Returns the outputs in job
+# order.  When a call fails, the other running calls are aborted.
+def call_stream_all(jobs, fd = 1, limit = None, withSlashLogger = True):
+  limit = limit or min(
+    multiprocessing.cpu_count(), get_media()._get_decode_slots())
+  pending = list(enumerate(jobs))
+  running = list()
+  outputs = [None] * len(jobs)
+
+  try:
+    while len(pending) or len(running):
+      while len(pending) and len(running) < limit:
+        n, (command, consumer) = pending.pop(0)
+        running.append(
+          (n, call_async(command, consumer, fd, withSlashLogger)))
+
+      get_call_loop().run(lambda: any(c.done for n, c in running))
+
+      for n, c in [r for r in running if r[1].done]:
+        running.remove((n, c))
+        outputs[n] = c.wait()
   finally:
-    timer.cancel()
-    timer.join(30)
-    reader.join(30)
-
-  if timeout.triggered:
-    error = True
-    get_media()._report_call_timeout()
-    message = "CALL TIMEOUT: timeout after {} seconds (pid: {}).".format(
-      timer.interval, proc.pid)
-  elif proc.returncode != 0:
-    error = True
-    message = "CALL ERROR: failed with exitcode {} (pid: {})".format(proc.returncode, proc.pid)
-
-  assert not error, message
-  return readproc.output
+    for n, c in running:
+      c.abort()
+    # jobs that never started still own their consumers (i.e. spill files)
+    for n, (command, consumer) in pending:
+      if consumer is not None:
+        consumer.close()
+
+  return outputs
 
 def try_call(command):
   try:
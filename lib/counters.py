@@ -0,0 +1,51 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import fcntl
+import json
+import os
+
+from common import atomic_write
+
+# Counters shared by all processes of a session (i.e. the parallel workers).
+# The counts live in a small json file that is read and updated under an
+# exclusive file lock, so increments from concurrent workers are never lost.
+
+class SharedCounters:
+  def __init__(self, filename):
+    self.filename = filename
+
+  def __transaction(self, update):
+    with open("{}.lock".format(self.filename), "a") as lock:
+      fcntl.flock(lock, fcntl.LOCK_EX)
+
+      try:
+        with open(self.filename, "r") as fd:
+          counts = json.load(fd)
+      except (IOError, OSError, ValueError):
+        counts = dict()
+
+      result = update(counts)
+      if result is None:
+        with atomic_write(self.filename, "w") as fd:
+          json.dump(counts, fd)
+
+      return result
+
+  def get(self, *keys):
+    return self.__transaction(
+      lambda counts: [counts.get(k, 0) for k in keys])
+
+  def increment(self, *keys):
+    def update(counts):
+      for k in keys:
+        counts[k] = counts.get(k, 0) + 1
+    self.__transaction(update)
+
+  def remove(self):
+    for filename in [self.filename, "{}.lock".format(self.filename)]:
+      if os.path.exists(filename):
+        os.remove(filename)
@@ -0,0 +1,70 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import glob
+import hashlib
+import json
+import os
+
+from capabilities import ENVIRONMENT, get_driver_paths, get_gst_registry
+from capabilities import get_mtime, which
+from metrics import md5
+
+# Test fingerprints for --reuse-results.  A fingerprint covers everything a
+# test result depends on: the test parameters, the content of its input files,
+# its baseline entry, the test code and the versions (binary mtimes) of the
+# tools, gstreamer plugins and va driver it runs on.  A test whose fingerprint
+# matches a previous pass does not need to run again.
+
+TOOLS = ["ffmpeg", "gst-launch-1.0", "gst-inspect-1.0"]
+
+__digests = dict()
+
+def __file_digest(filename):
+  stat = os.stat(filename)
+  key = (os.path.realpath(filename), stat.st_size, stat.st_mtime)
+  if key not in __digests:
+    __digests[key] = md5(filename)
+  return __digests[key]
+
+def __code_digest(dirs):
+  files = sorted(set(
+    f for d in dirs for f in glob.glob(os.path.join(d, "*.py"))))
+  return [__file_digest(f) for f in files]
+
+def __driver(name):
+  for path in get_driver_paths():
+    filename = os.path.join(path, "{}_drv_video.so".format(name))
+    if os.path.exists(filename):
+      return [filename, get_mtime(filename)]
+  return [name, None]
+
+def __inputs(value):
+  # digests of all existing files referenced by value (i.e. a test spec entry)
+  if isinstance(value, basestring):
+    if os.path.isfile(value):
+      return [value, __file_digest(value)]
+    return None
+  if isinstance(value, dict):
+    return dict((k, __inputs(v)) for k, v in value.items())
+  if isinstance(value, (list, tuple)):
+    return [__inputs(v) for v in value]
+  return None
+
+def fingerprint(address, spec, baseline, codedirs, driver):
+  key = dict(
+    address = address,
+    spec = spec,
+    inputs = __inputs(spec),
+    baseline = baseline,
+    code = __code_digest(codedirs),
+    tools = [[t, get_mtime(which(t))] for t in TOOLS],
+    gst = get_gst_registry(),
+    driver = __driver(driver),
+    environment = [os.environ.get(e, None) for e in ENVIRONMENT],
+  )
+  return hashlib.sha1(
+    json.dumps(key, sort_keys = True, default = str)).hexdigest()
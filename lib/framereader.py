@@ -5,30 +5,91 @@
 ###
 
 import numpy
+from numpy.lib.stride_tricks import as_strided
+import os
+
+# Maps an entire raw video file into memory once and hands out plane data as
+# views by offset.  The read_frame_* functions use it in place of a regular
+# file object so that per-frame reads do not incur any syscalls or copies.
+class MappedFile:
+  def __init__(self, filename):
+    if os.stat(filename).st_size > 0:
+      self.data = numpy.memmap(filename, dtype = numpy.uint8, mode = "r")
+    else: # mmap does not support empty files
+      self.data = numpy.zeros(0, dtype = numpy.uint8)
+    self.offset = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def close(self):
+    # views handed out by read() keep the mapping alive until released
+    self.data = None
+
+  def read(self, dtype, count):
+    # return a view of the next count items and advance the cursor.  A short
+    # read yields fewer items, just like numpy.fromfile would.
+    itemsize = numpy.dtype(dtype).itemsize
+    start = self.offset
+    end = min(start + count * itemsize, len(self.data))
+    end -= (end - start) % itemsize if end > start else 0
+    self.offset += count * itemsize
+    return self.data[start:max(start, end)].view(dtype)
+
+  def read_frames(self, reader, width, height, nframes):
+    # return the planes of the next nframes frames as (nframes, h, w) stacks.
+    # The reader lays out the first frame and the stacks are strided views of
+    # it that step one frame at a time through the mapping.
+    start = self.offset
+    planes = reader(self, width, height)
+    framesize = self.offset - start
+    self.offset = start + framesize * nframes
+    assert self.offset <= len(self.data), (
+      "expected {} bytes, got {}".format(self.offset, len(self.data)))
+
+    def stack(plane):
+      if plane is None: # handle Y800 case
+        return None
+      assert numpy.may_share_memory(plane, self.data), "plane is not a view"
+      return as_strided(
+        plane, shape = (nframes,) + plane.shape,
+        strides = (framesize,) + plane.strides)
+
+    return tuple(stack(p) for p in planes)
+
+# A MappedFile over raw frame data that is already in memory (e.g. a frame
+# received from a pipe by common.call_stream).
+class FrameBuffer(MappedFile):
+  def __init__(self, data):
+    self.data = numpy.frombuffer(data, dtype = numpy.uint8)
+    self.offset = 0
 
 def read_frame_422H(fd, width, height):
   width2 = width/2
   size = width * height
   size2 = width2 * height
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height,width))
-  u = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height,width2))
-  v = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height,width2))
+  y = fd.read(numpy.uint8, size).reshape((height,width))
+  u = fd.read(numpy.uint8, size2).reshape((height,width2))
+  v = fd.read(numpy.uint8, size2).reshape((height,width2))
   return y, u, v
 
 def read_frame_422V(fd, width, height):
   height2 = height/2
   size = width * height
   size2 = width * height2
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height,width))
-  u = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2,width))
-  v = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2,width))
+  y = fd.read(numpy.uint8, size).reshape((height,width))
+  u = fd.read(numpy.uint8, size2).reshape((height2,width))
+  v = fd.read(numpy.uint8, size2).reshape((height2,width))
   return y, u, v
 
 def read_frame_444P(fd, width, height):
   size = width * height
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height,width))
-  u = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height,width))
-  v = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height,width))
+  y = fd.read(numpy.uint8, size).reshape((height,width))
+  u = fd.read(numpy.uint8, size).reshape((height,width))
+  v = fd.read(numpy.uint8, size).reshape((height,width))
   return y, u, v
 
 def read_frame_I420(fd, width, height):
@@ -37,16 +98,16 @@ def read_frame_I420(fd, width, height):
   size    = width * height
   size2   = width2 * height2
 
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height, width))
-  u = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2, width2))
-  v = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2, width2))
+  y = fd.read(numpy.uint8, size).reshape((height, width))
+  u = fd.read(numpy.uint8, size2).reshape((height2, width2))
+  v = fd.read(numpy.uint8, size2).reshape((height2, width2))
 
   return y, u, v
 
 def read_frame_Y800(fd, width, height):
   size = width * height
 
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height, width))
+  y = fd.read(numpy.uint8, size).reshape((height, width))
 
   return y, None, None
 
@@ -56,9 +117,9 @@ def read_frame_YV12(fd, width, height):
   size    = width * height
   size2   = width2 * height2
 
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height, width))
-  v = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2, width2))
-  u = numpy.fromfile(fd, dtype=numpy.uint8, count=size2).reshape((height2, width2))
+  y = fd.read(numpy.uint8, size).reshape((height, width))
+  v = fd.read(numpy.uint8, size2).reshape((height2, width2))
+  u = fd.read(numpy.uint8, size2).reshape((height2, width2))
 
   return y, u, v
 
@@ -67,8 +128,8 @@ def read_frame_NV12(fd, width, height):
   height2 = height/2
   size = width * height
 
-  y = numpy.fromfile(fd, dtype=numpy.uint8, count=size).reshape((height, width))
-  uv = numpy.fromfile(fd, dtype=numpy.uint8, count=width*height2)
+  y = fd.read(numpy.uint8, size).reshape((height, width))
+  uv = fd.read(numpy.uint8, width*height2)
 
   return y, uv[0::2].reshape((height2,width2)), uv[1::2].reshape((height2,width2))
 
@@ -77,15 +138,15 @@ def read_frame_P010(fd, width, height):
   height2 = height/2
   size = width * height
 
-  y = numpy.fromfile(fd, dtype=numpy.uint16, count=size).reshape((height, width))
-  uv = numpy.fromfile(fd, dtype=numpy.uint16, count=width*height2)
+  y = fd.read(numpy.uint16, size).reshape((height, width))
+  uv = fd.read(numpy.uint16, width*height2)
 
   return y, uv[0::2].reshape((height2, width2)), uv[1::2].reshape((height2, width2))
 
 def read_frame_AYUV(fd, width, height):
   size = width * height * 4
 
-  ayuv = numpy.fromfile(fd, dtype=numpy.uint8, count=size)
+  ayuv = fd.read(numpy.uint8, size)
   a = ayuv[0::4].reshape((height, width))
   y = ayuv[1::4].reshape((height, width))
   u = ayuv[2::4].reshape((height, width))
@@ -98,7 +159,7 @@ def read_frame_YUY2(fd, width, height):
   height2 = height/2
   size = width * height * 2
 
-  yuv = numpy.fromfile(fd, dtype=numpy.uint8, count=size)
+  yuv = fd.read(numpy.uint8, size)
   y = yuv[0::2].reshape((height, width))
   u = yuv[1::4].reshape((height2, width))
   v = yuv[3::4].reshape((height, width2))
@@ -108,7 +169,7 @@ def read_frame_YUY2(fd, width, height):
 def read_frame_ARGB(fd, width, height):
   size = width * height * 4
 
-  argb = numpy.fromfile(fd, dtype=numpy.uint8, count=size)
+  argb = fd.read(numpy.uint8, size)
   a = argb[0::4].reshape((height, width))
   r = argb[1::4].reshape((height, width))
   g = argb[2::4].reshape((height, width))
@@ -121,18 +182,18 @@ def read_frame_P210(fd, width, height):
   size = width * height
   size2 = width2 * height
 
-  y = numpy.fromfile(fd, dtype=numpy.uint16, count=size).reshape((height,width))
-  u = numpy.fromfile(fd, dtype=numpy.uint16, count=size2).reshape((height,width2))
-  v = numpy.fromfile(fd, dtype=numpy.uint16, count=size2).reshape((height,width2))
+  y = fd.read(numpy.uint16, size).reshape((height,width))
+  u = fd.read(numpy.uint16, size2).reshape((height,width2))
+  v = fd.read(numpy.uint16, size2).reshape((height,width2))
 
   return y, u, v
 
 def read_frame_P410(fd, width, height):
   size = width * height
 
-  y = numpy.fromfile(fd, dtype=numpy.uint16, count=size).reshape((height,width))
-  u = numpy.fromfile(fd, dtype=numpy.uint16, count=size).reshape((height,width))
-  v = numpy.fromfile(fd, dtype=numpy.uint16, count=size).reshape((height,width))
+  y = fd.read(numpy.uint16, size).reshape((height,width))
+  u = fd.read(numpy.uint16, size).reshape((height,width))
+  v = fd.read(numpy.uint16, size).reshape((height,width))
 
   return y, u, v
 
@@ -0,0 +1,74 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+from __future__ import absolute_import
+import os
+import platform
+import sqlite3
+
+# History of test durations, per test address, environment (host and kernel)
+# and driver.  Parallel sessions use it to start the longest tests first, so a
+# long test does not end up running alone at the tail of the session.  The
+# history also keeps the fingerprints of passed tests (see --reuse-results and
+# lib/fingerprint.py).  The history is an sqlite database, which serializes the
+# concurrent updates of parallel workers and sessions.
+
+def get_environment():
+  return "{}:{}".format(platform.node(), platform.release())
+
+class History:
+  # weight of a new duration in the running estimate
+  ALPHA = 0.5
+
+  def __init__(self, filename):
+    if not os.path.exists(os.path.dirname(filename)):
+      try:
+        os.makedirs(os.path.dirname(filename))
+      except OSError:
+        pass # created concurrently
+    self.db = sqlite3.connect(filename, timeout = 60)
+    with self.db:
+      self.db.execute(
+        "CREATE TABLE IF NOT EXISTS durations ("
+        " address TEXT, environment TEXT, driver TEXT,"
+        " seconds REAL, runs INTEGER,"
+        " PRIMARY KEY (address, environment, driver))")
+      self.db.execute(
+        "CREATE TABLE IF NOT EXISTS passes ("
+        " address TEXT, fingerprint TEXT, seconds REAL,"
+        " PRIMARY KEY (address, fingerprint))")
+
+  def close(self):
+    self.db.close()
+
+  def record(self, address, environment, driver, seconds):
+    with self.db:
+      self.db.execute(
+        "INSERT OR IGNORE INTO durations VALUES (?, ?, ?, ?, 0)",
+        (address, environment, driver, seconds))
+      self.db.execute(
+        "UPDATE durations SET seconds = ? * ? + (1 - ?) * seconds,"
+        " runs = runs + 1"
+        " WHERE address = ? AND environment = ? AND driver = ?",
+        (self.ALPHA, seconds, self.ALPHA, address, environment, driver))
+
+  def estimates(self, environment, driver):
+    return dict(self.db.execute(
+      "SELECT address, seconds FROM durations"
+      " WHERE environment = ? AND driver = ?", (environment, driver)))
+
+  def record_pass(self, address, fingerprint, seconds):
+    with self.db:
+      self.db.execute(
+        "INSERT OR REPLACE INTO passes VALUES (?, ?, ?)",
+        (address, fingerprint, seconds))
+
+  # Returns the duration of the previous pass with fingerprint, or None.
+  def find_pass(self, address, fingerprint):
+    row = self.db.execute(
+      "SELECT seconds FROM passes WHERE address = ? AND fingerprint = ?",
+      (address, fingerprint)).fetchone()
+    return None if row is None else row[0]
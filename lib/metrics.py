@@ -6,142 +6,178 @@
 
 import hashlib
 import itertools
+import json
+import numpy
 import os
-import skimage.measure
+import re
 
-from common import get_media
-from framereader import FrameReaders
+from common import atomic_write, get_media
+from framereader import FrameBuffer, FrameReaders, MappedFile
 
-def md5(filename, chunksize = 4096, numbytes = -1):
+def __md5(filename, chunksize, numbytes, perchunk):
   if numbytes < 0: # calculate checksum on entire file
     numbytes = os.stat(filename).st_size
 
   numbytesread = 0
   m = hashlib.md5()
+  chunks = list()
   with open(filename, "rb") as f:
-
-    # read numchunks of size chunksize
-    numchunks = int(numbytes / chunksize)
-    if numchunks > 0:
-      for n, chunk in enumerate(iter(lambda: f.read(chunksize), b""), 1):
-        numbytesread += len(chunk)
-        m.update(chunk)
-        if n == numchunks:
-          break
-
-    # read remainder of bytes < chunksize
-    lastchunk = f.read(numbytes % chunksize)
-    numbytesread += len(lastchunk)
-    m.update(lastchunk)
+    while numbytesread < numbytes:
+      chunk = f.read(min(chunksize, numbytes - numbytesread))
+      if not len(chunk):
+        break
+      numbytesread += len(chunk)
+      m.update(chunk)
+      if perchunk:
+        chunks.append(hashlib.md5(chunk).hexdigest())
 
   # fail if we did not read exactly numbytes
   assert numbytesread == numbytes, "md5: expected {} bytes, got {}".format(numbytes, numbytesread)
 
-  return m.hexdigest()
+  return m.hexdigest(), chunks
+
+def md5(filename, chunksize = 4 * 1024 * 1024, numbytes = -1):
+  return __md5(filename, chunksize, numbytes, False)[0]
 
-def __try_read_frame(reader, *args, **kwargs):
+# Same as md5, but the checksum of each frame is computed in the same pass.
+# Returns (file checksum, list of frame checksums).
+def md5_frames(filename, framesize, numbytes = -1):
+  return __md5(filename, framesize, numbytes, True)
+
+def __try_read_frames(fd, reader, width, height, nframes, **kwargs):
   try:
-    return reader(*args)
+    return fd.read_frames(reader, width, height, nframes)
   except Exception, e:
     e.args += tuple("{}: {}".format(k,v) for k,v in kwargs.items())
     raise
 
-class MetricsResult:
-  def __init__(self, y, u, v):
-    self.result = (y, u, v)
+# upper bound on the temporary buffers used to process a chunk of frames
+METRICS_CHUNK_BYTES = 64 * 1024 * 1024
+
+def __chunks(a, b, nbuffers):
+  # split (frames, height, width) stacks into chunks of frames, promoted to
+  # int64 so that all sums below are exact
+  step = max(1, METRICS_CHUNK_BYTES / (a[0].size * 8 * nbuffers))
+  for i in xrange(0, len(a), step):
+    yield i, a[i:i+step].astype(numpy.int64), b[i:i+step].astype(numpy.int64)
 
-  def get(self):
-    return self.result
+def __window_sum(x, size):
+  # box filter via cumulative sums along the height axis, valid region only
+  c = numpy.cumsum(x, axis = 1)
+  s = c[:, size-1:].copy()
+  s[:, 1:] -= c[:, :-size]
+  return s
 
-def __compare_ssim(planes):
-  a, b = planes
+def __compare_ssim_stack(a, b, nframes, win_size = 3):
   if a is None or b is None: # handle Y800 case
-    return 1.0
-  return skimage.measure.compare_ssim(a, b, multichannel=True, win_size=3)
+    return [1.0] * nframes
 
-def calculate_ssim(filename1, filename2, width, height, nframes = 1, fourcc = "I420", fourcc2 = None):
-  reader  = FrameReaders[fourcc]
-  reader2 = FrameReaders[fourcc2 or fourcc]
-  results = list()
-
-  with open(filename1, "rb") as fd1, open(filename2, "rb") as fd2:
-    for i in range(nframes):
-      y1, u1, v1 = __try_read_frame(
-        reader, fd1, width, height, debug = (i, nframes, 1))
-      y2, u2, v2 = __try_read_frame(
-        reader2, fd2, width, height, debug = (i, nframes, 2))
-
-      if get_media().metrics_pool is not None:
-        results.append(
-          get_media().metrics_pool.map_async(
-            __compare_ssim, ((y1, y2), (u1, u2), (v1, v2))
-          )
-        )
-      else:
-        results.append(
-          MetricsResult(
-            __compare_ssim((y1, y2)),
-            __compare_ssim((u1, u2)),
-            __compare_ssim((v1, v2))
-          )
-        )
-
-  result = list(itertools.chain(*[r.get() for r in results]))
+  # Equivalent to skimage.measure.compare_ssim(a, b, multichannel = True,
+  # win_size = 3) per frame.  With multichannel on a 2-D plane, skimage treats
+  # each column as a channel, so the window spans win_size rows of a column
+  # and the result is the mean over the cropped (valid) rows of all columns.
+  assert a.shape[1] >= win_size, "win_size exceeds image extent"
 
-  return (
-    min(result[0::3]),
-    min(result[1::3]),
-    min(result[2::3]),
-    sum(result[0::3]) / nframes,
-    sum(result[1::3]) / nframes,
-    sum(result[2::3]) / nframes,
-  )
+  R = float(numpy.iinfo(a.dtype).max - numpy.iinfo(a.dtype).min)
+  C1 = (0.01 * R) ** 2
+  C2 = (0.03 * R) ** 2
+  cov_norm = win_size / (win_size - 1.0)
 
-def __compare_psnr(planes):
-  a, b = planes
-  if (a == b).all():
-    # Avoid "Warning: divide by zero encountered in double_scalars" generated
-    # by skimage.measure.compare_psnr when a and b are exactly the same.
-    return 100
-  return skimage.measure.compare_psnr(a, b)
+  ssim = numpy.zeros(len(a), dtype = numpy.float64)
+  for i, x, y in __chunks(a, b, 10):
+    ux  = __window_sum(x, win_size) / float(win_size)
+    uy  = __window_sum(y, win_size) / float(win_size)
+    uxx = __window_sum(x * x, win_size) / float(win_size)
+    uyy = __window_sum(y * y, win_size) / float(win_size)
+    uxy = __window_sum(x * y, win_size) / float(win_size)
 
-def calculate_psnr(filename1, filename2, width, height, nframes = 1, fourcc = "I420"):
-  reader  = FrameReaders[fourcc]
-  results = list()
-
-  with open(filename1, "rb") as fd1, open(filename2, "rb") as fd2:
-    for i in range(nframes):
-      y1, u1, v1 = __try_read_frame(
-        reader, fd1, width, height, debug = (i, nframes, 1))
-      y2, u2, v2 = __try_read_frame(
-        reader, fd2, width, height, debug = (i, nframes, 2))
-
-      if get_media().metrics_pool is not None:
-        results.append(
-          get_media().metrics_pool.map_async(
-            __compare_psnr, ((y1, y2), (u1, u2), (v1, v2))
-          )
-        )
-      else:
-        results.append(
-          MetricsResult(
-            __compare_psnr((y1, y2)),
-            __compare_psnr((u1, u2)),
-            __compare_psnr((v1, v2))
-          )
-        )
-
-  result = list(itertools.chain(*[r.get() for r in results]))
+    vx  = cov_norm * (uxx - ux * ux)
+    vy  = cov_norm * (uyy - uy * uy)
+    vxy = cov_norm * (uxy - ux * uy)
+
+    S = ((2 * ux * uy + C1) * (2 * vxy + C2)) / (
+      (ux ** 2 + uy ** 2 + C1) * (vx + vy + C2))
+    ssim[i:i+len(x)] = S.reshape(len(S), -1).mean(axis = 1)
+
+  return ssim.tolist()
+
+def __compare_psnr_stack(a, b, nframes):
+  if a is None or b is None: # handle Y800 case
+    return [100] * nframes
+
+  # Per-frame squared error is accumulated in chunks of frames with exact
+  # integer arithmetic (skimage.measure.compare_psnr equivalent).
+  sse = numpy.zeros(len(a), dtype = numpy.float64)
+  for i, x, y in __chunks(a, b, 3):
+    d = x - y
+    sse[i:i+len(d)] = (d * d).reshape(len(d), -1).sum(axis = 1)
+
+  peak = float(numpy.iinfo(a.dtype).max)
+  with numpy.errstate(divide = "ignore"):
+    psnr = 10 * numpy.log10((peak ** 2) / (sse / a[0].size))
+
+  # Identical frames would be infinite, report 100 like before
+  psnr[sse == 0] = 100
+  return psnr.tolist()
+
+def __compare_plane(job):
+  compare, filename1, filename2, width, height, nframes, fourcc, fourcc2, plane = job
+
+  with MappedFile(filename1) as fd1, MappedFile(filename2) as fd2:
+    a = __try_read_frames(
+      fd1, FrameReaders[fourcc], width, height, nframes, debug = (nframes, 1))
+    b = __try_read_frames(
+      fd2, FrameReaders[fourcc2], width, height, nframes, debug = (nframes, 2))
+    return compare(a[plane], b[plane], nframes)
+
+def __calculate_metric(metric, compare, filename1, filename2, width, height, nframes, fourcc, fourcc2):
+  cache = get_media().metrics_cache
+  if cache is not None:
+    key = cache.key(
+      metric, filename1, filename2, width, height, nframes, fourcc, fourcc2)
+    result = cache.get(key)
+    if result is not None:
+      return result
+
+  result = __compute_metric(
+    compare, filename1, filename2, width, height, nframes, fourcc, fourcc2)
+
+  if cache is not None:
+    cache.put(key, result)
+
+  return result
+
+def __compute_metric(compare, filename1, filename2, width, height, nframes, fourcc, fourcc2):
+  # Each job maps the files itself so that only the file names need to be
+  # handed to the metrics_pool workers, not the frame data.
+  jobs = [
+    (compare, filename1, filename2, width, height, nframes, fourcc, fourcc2, plane)
+      for plane in xrange(3)]
+
+  if get_media().metrics_pool is not None:
+    result = get_media().metrics_pool.map(__compare_plane, jobs)
+  else:
+    result = map(__compare_plane, jobs)
 
   return (
-    min(result[0::3]),
-    min(result[1::3]),
-    min(result[2::3]),
-    sum(result[0::3]) / nframes,
-    sum(result[1::3]) / nframes,
-    sum(result[2::3]) / nframes,
+    min(result[0]),
+    min(result[1]),
+    min(result[2]),
+    sum(result[0]) / nframes,
+    sum(result[1]) / nframes,
+    sum(result[2]) / nframes,
   )
 
+def calculate_ssim(filename1, filename2, width, height, nframes = 1, fourcc = "I420", fourcc2 = None):
+  return __calculate_metric(
+    "ssim", __compare_ssim_stack, filename1, filename2,
+    width, height, nframes, fourcc, fourcc2 or fourcc)
+
+def calculate_psnr(filename1, filename2, width, height, nframes = 1, fourcc = "I420"):
+  return __calculate_metric(
+    "psnr", __compare_psnr_stack, filename1, filename2,
+    width, height, nframes, fourcc, fourcc)
+
 def get_framesize(width, height, fourcc):
   return {
     "I420" : lambda w,h: w*h*3/2,
@@ -164,32 +200,344 @@ def check_filesize(filename, width, height, nframes, fourcc):
   actual = os.stat(filename).st_size
   assert expected == actual
 
+# Persistent cache of calculate_psnr/calculate_ssim results (see the
+# --metrics-cache option).  Results are keyed by the content digests of both
+# files plus geometry, fourccs, frame count and metric type, so byte-identical
+# outputs of reruns or other tests hit the cache.  File digests are cached too,
+# keyed by path, inode, size and mtime, so that a shared reference is only
+# hashed once.  The least recently used entries are evicted when the cache
+# grows beyond maxsize bytes.
+class MetricsCache:
+  # bump when a metric implementation changes its results
+  VERSION = 1
+
+  def __init__(self, path, maxsize):
+    self.path = path
+    self.maxsize = maxsize
+    for d in ["results", "digests"]:
+      if not os.path.exists(os.path.join(self.path, d)):
+        try:
+          os.makedirs(os.path.join(self.path, d))
+        except OSError: # another worker created it
+          pass
+
+  def __entry(self, kind, key):
+    return os.path.join(
+      self.path, kind, hashlib.sha1(json.dumps(key)).hexdigest())
+
+  def __read(self, filename):
+    try:
+      with open(filename, "rb") as fd:
+        value = json.load(fd)
+      os.utime(filename, None) # mark as recently used
+      return value
+    except (IOError, OSError, ValueError):
+      return None
+
+  def __write(self, filename, value):
+    with atomic_write(filename) as fd:
+      json.dump(value, fd)
+    self.__evict()
+
+  def __evict(self):
+    entries = list()
+    for d in ["results", "digests"]:
+      for name in os.listdir(os.path.join(self.path, d)):
+        try:
+          st = os.stat(os.path.join(self.path, d, name))
+        except OSError: # evicted by another worker
+          continue
+        entries.append((st.st_mtime, st.st_size, os.path.join(self.path, d, name)))
+
+    size = sum(e[1] for e in entries)
+    for mtime, esize, filename in sorted(entries):
+      if size <= self.maxsize:
+        break
+      try:
+        os.remove(filename)
+      except OSError:
+        pass
+      size -= esize
+
+  def digest(self, filename):
+    st = os.stat(filename)
+    entry = self.__entry("digests", [
+      os.path.realpath(filename), st.st_ino, st.st_size, st.st_mtime])
+    digest = self.__read(entry)
+    if digest is None:
+      digest = md5(filename)
+      self.__write(entry, digest)
+    return digest
+
+  def key(self, metric, filename1, filename2, width, height, nframes, fourcc, fourcc2):
+    return self.digest_key(
+      metric, self.digest(filename1), self.digest(filename2),
+      width, height, nframes, fourcc, fourcc2)
+
+  def digest_key(self, metric, digest1, digest2, width, height, nframes, fourcc, fourcc2):
+    return [
+      self.VERSION, metric, digest1, digest2,
+      width, height, nframes, fourcc, fourcc2]
+
+  def get(self, key):
+    result = self.__read(self.__entry("results", key))
+    return tuple(result) if result is not None else None
+
+  def put(self, key, result):
+    self.__write(self.__entry("results", key), list(result))
+
+# Base for consumers of common.call_stream.  Frames are optionally spilled to
+# a file so that the output can still be kept as a test artifact.
+class StreamConsumer:
+  def __init__(self, framesize, spill = None):
+    self.framesize = framesize
+    self.nbytes = 0
+    self.spill = open(spill, "wb") if spill is not None else None
+
+  def write(self, data):
+    if self.spill is not None:
+      self.spill.write(data)
+    self.nbytes += len(data)
+    self.update(data)
+
+  def close(self):
+    if self.spill is not None:
+      self.spill.close()
+      self.spill = None
+
+class Md5Stream(StreamConsumer):
+  def __init__(self, framesize, numbytes, spill = None):
+    StreamConsumer.__init__(self, framesize, spill)
+    self.numbytes = numbytes
+    self.md5 = hashlib.md5()
+    self.frames = list()
+
+  def update(self, data):
+    # only checksum the first numbytes, like md5(numbytes = ...)
+    data = data[:max(0, self.numbytes - (self.nbytes - len(data)))]
+    if len(data):
+      self.md5.update(data)
+      self.frames.append(hashlib.md5(data).hexdigest())
+
+  def result(self):
+    numbytesread = min(self.nbytes, self.numbytes)
+    assert numbytesread == self.numbytes, "md5: expected {} bytes, got {}".format(
+      self.numbytes, numbytesread)
+    return self.md5.hexdigest()
+
+class CompareStream(StreamConsumer):
+  def __init__(self, compare, reference, width, height, nframes, fourcc, fourcc2, spill = None):
+    StreamConsumer.__init__(self, get_framesize(width, height, fourcc2), spill)
+    self.compare = compare
+    self.reference = MappedFile(reference)
+    self.width = width
+    self.height = height
+    self.nframes = nframes
+    self.readers = (FrameReaders[fourcc], FrameReaders[fourcc2])
+    self.results = ([], [], [])
+
+  def update(self, data):
+    if len(self.results[0]) >= self.nframes or len(data) < self.framesize:
+      return # ignore extra frames and trailing partial frame
+
+    a = self.reference.read_frames(self.readers[0], self.width, self.height, 1)
+    b = FrameBuffer(data).read_frames(self.readers[1], self.width, self.height, 1)
+    for plane in xrange(3):
+      self.results[plane].extend(self.compare(a[plane], b[plane], 1))
+
+  def close(self):
+    StreamConsumer.close(self)
+    self.reference.close()
+
+  def result(self):
+    nframes = len(self.results[0])
+    assert nframes == self.nframes, "expected {} frames, got {}".format(
+      self.nframes, nframes)
+    return (
+      min(self.results[0]),
+      min(self.results[1]),
+      min(self.results[2]),
+      sum(self.results[0]) / nframes,
+      sum(self.results[1]) / nframes,
+      sum(self.results[2]) / nframes,
+    )
+
+# With a metrics cache, a streamed output is hashed and spilled to disk instead
+# of being compared while it is produced: the cache key needs the digest of the
+# complete output, so the comparison is deferred until the stream ended, and
+# skipped when the cache already has the result.  The key is the same as for
+# calculate_psnr/calculate_ssim of the equivalent file.
+class CachedCompareStream(StreamConsumer):
+  def __init__(self, metric, compute, compare, reference, width, height, nframes, fourcc, fourcc2, spill, temporary):
+    StreamConsumer.__init__(self, get_framesize(width, height, fourcc2), spill)
+    self.compute = compute
+    self.filename = spill
+    self.temporary = temporary
+    self.md5 = hashlib.md5()
+    self.args = (
+      metric, compare, reference, width, height, nframes, fourcc, fourcc2)
+
+  def update(self, data):
+    self.md5.update(data)
+
+  def result(self):
+    metric, compare, reference, width, height, nframes, fourcc, fourcc2 = self.args
+    cache = get_media().metrics_cache
+    key = cache.digest_key(
+      metric, cache.digest(reference), self.md5.hexdigest(),
+      width, height, nframes, fourcc, fourcc2)
+
+    try:
+      result = cache.get(key)
+      if result is None:
+        result = self.compute(
+          compare, reference, self.filename, width, height, nframes, fourcc,
+          fourcc2)
+        cache.put(key, result)
+    finally:
+      if self.temporary and os.path.exists(self.filename):
+        os.remove(self.filename)
+
+    return result
+
+__spills = itertools.count()
+
+# Create the call_stream consumer that computes the metric of check_metric
+# params while the output is produced.  The output is only spilled to disk if
+# params["decoded"] is set (see MediaPlugin._stream_artifact).  Pass the
+# consumer to check_metric as params["stream"] to check its result.
+def stream_metric(**params):
+  metric = params["metric"]
+  type = metric["type"]
+  format2 = params.get("format2", None) or params["format"]
+
+  if "md5" == type:
+    framesize = get_framesize(params["width"], params["height"], format2)
+    return Md5Stream(
+      framesize, metric.get("numbytes", framesize * params["frames"]),
+      params.get("decoded", None))
+
+  elif type in ["ssim", "psnr"]:
+    compare = __compare_ssim_stack if "ssim" == type else __compare_psnr_stack
+    if get_media().metrics_cache is not None:
+      spill = params.get("decoded", None)
+      # a temporary spill is removed by result(), or at the end of the test
+      # when the call failed before (see MediaPlugin._temporary_file)
+      temporary = spill is None
+      if temporary:
+        spill = get_media()._temporary_file(
+          "metric_stream_{}.yuv".format(next(__spills)))
+      return CachedCompareStream(
+        type, __compute_metric, compare, params["reference"], params["width"], params["height"],
+        params["frames"], params["format"], format2, spill, temporary)
+    return CompareStream(
+      compare, params["reference"], params["width"], params["height"],
+      params["frames"], params["format"], format2, params.get("decoded", None))
+
+  else:
+    assert False, "unknown metric"
+
+# Frames per second of a null sink pipeline (see the perf metric), from the
+# ffmpeg -benchmark real time or the gst-launch-1.0 execution time (which
+# excludes the pipeline setup).
+def parse_fps(output, frames):
+  m = re.findall(r"bench: .*rtime=(\d+\.?\d*)s", output)
+  if len(m):
+    seconds = float(m[-1])
+  else:
+    m = re.findall(r"Execution ended after (\d+):(\d+):(\d+\.?\d*)", output)
+    if not len(m):
+      return None
+    h, mi, sec = m[-1]
+    seconds = int(h) * 3600 + int(mi) * 60 + float(sec)
+  return frames / seconds if seconds > 0 else None
+
+# Per-frame latencies in ms, from the gst-launch-1.0 latency tracer (source to
+# sink, GST_TRACERS=latency GST_DEBUG=GST_TRACER:7).
+def parse_latencies(output):
+  return [int(ns) / 1000000.0 for ns in re.findall(
+    r"\slatency, .*?\btime=\(guint64\)(\d+)", output)]
+
+# Per-call times in ms of an ffmpeg codec stage (i.e. "decode_video" or
+# "encode_video"), from -benchmark_all.  This is the time a frame spends in one
+# codec call, not its input to output latency (codec delay is not included).
+def parse_calltimes(output, stage = None):
+  return [int(us) / 1000.0 for us, name in re.findall(
+    r"bench:\s+\d+ user\s+\d+ sys\s+(\d+) real (\w+)", output)
+      if stage is None or name == stage]
+
+LATENCY_PERCENTILES = [50, 95, 99, 100]
+
 def check_metric(**params):
   metric = params["metric"]
   type = metric["type"]
+  stream = params.get("stream", None)
 
   if "ssim" == type:
     miny = metric.get("miny", 1.0)
     minu = metric.get("minu", 1.0)
     minv = metric.get("minv", 1.0)
-    ssim = calculate_ssim(
-      params["reference"], params["decoded"],
-      params["width"], params["height"], params["frames"],
-      params["format"], params.get("format2", None))
+    if stream is not None:
+      ssim = stream.result()
+    else:
+      ssim = calculate_ssim(
+        params["reference"], params["decoded"],
+        params["width"], params["height"], params["frames"],
+        params["format"], params.get("format2", None))
     get_media()._set_test_details(ssim = ssim)
     assert 1.0 >= ssim[0] >= miny
     assert 1.0 >= ssim[1] >= minu
     assert 1.0 >= ssim[2] >= minv
 
+  elif "psnr" == type:
+    if stream is not None:
+      psnr = stream.result()
+    else:
+      psnr = calculate_psnr(
+        params["reference"], params["decoded"],
+        params["width"], params["height"], params["frames"],
+        params["format"])
+    get_media().baseline.check_psnr(
+      psnr = psnr, context = params.get("refctx", []))
+
   elif "md5" == type:
-    numbytes = metric.get("numbytes", get_framesize(
-      params["width"], params["height"],
-      params.get("format2", params["format"])
-    ) * params["frames"])
-    res = md5(filename = params["decoded"], numbytes = numbytes)
+    if stream is not None:
+      res, frames = stream.result(), stream.frames
+    else:
+      framesize = get_framesize(
+        params["width"], params["height"],
+        params.get("format2", params["format"]))
+      numbytes = metric.get("numbytes", framesize * params["frames"])
+      res, frames = md5_frames(
+        filename = params["decoded"], framesize = framesize, numbytes = numbytes)
+    get_media()._set_test_details(md5_frames = frames)
     get_media().baseline.check_md5(
-      md5 = res, context = params.get("refctx", []))
+      md5 = res, context = params.get("refctx", []), frames = frames)
+
+  elif "perf" == type:
+    fps = parse_fps(params["output"], params["frames"])
+    assert fps is not None, "no benchmark timing in output"
+    get_media().baseline.check_perf(
+      fps = fps, context = params.get("refctx", []),
+      tolerance = metric.get("tolerance", None))
+
+  elif "latency" == type:
+    latencies = parse_latencies(params["output"])
+    assert len(latencies), "no frame latencies in output"
+    get_media()._set_test_details(latency_frames = len(latencies))
+    get_media().baseline.check_latency(
+      latency = numpy.percentile(latencies, LATENCY_PERCENTILES).tolist(),
+      context = params.get("refctx", []),
+      thresholds = metric.get("thresholds", None))
+
+  elif "calltime" == type:
+    calltimes = parse_calltimes(params["output"], metric.get("stage", None))
+    assert len(calltimes), "no codec call times in output"
+    get_media()._set_test_details(calltime_calls = len(calltimes))
+    get_media().baseline.check_latency(
+      latency = numpy.percentile(calltimes, LATENCY_PERCENTILES).tolist(),
+      context = params.get("refctx", []),
+      thresholds = metric.get("thresholds", None), key = "calltime")
 
   else:
     assert False, "unknown metric"
-
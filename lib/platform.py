@@ -99,6 +99,28 @@ def platform_tags(platforms):
     return f
   return wrap
 
+# The platforms, out of the given ones, that the command line filters select:
+# those named by a filter (i.e. "-k ICL"), or all of them unless negated (i.e.
+# "-k 'not ICL'").  Only whole platform names count, so other filters (i.e.
+# "-k L") select all of them.
+def get_selected_platforms(platforms):
+  import re
+  import slash
+  named, negated = set(), set()
+  for s in slash.config.root.run.filter_strings:
+    tokens = re.findall(r"[\w:]+", s)
+    for i, token in enumerate(tokens):
+      token = token.split(":")[-1] # i.e. "tag:ICL"
+      if token in ALL_PLATFORMS:
+        if i > 0 and "not" == tokens[i - 1]:
+          negated.add(token)
+        else:
+          named.add(token)
+  selected = set(platforms) - negated
+  if len(named):
+    selected &= named
+  return sorted(selected)
+
 def info():
   import platform
   try:
@@ -0,0 +1,184 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import errno
+import fcntl
+import json
+import os
+import tempfile
+import time
+
+from common import atomic_write
+
+# Resource tokens let parallel workers (and concurrent sessions on the same
+# host) share the GPU engines, memory and disk without oversubscribing them.
+# Each test is classified into tokens (see classify) and only starts once all
+# of its tokens fit into the pool capacities.  The pool is a ledger file,
+# updated under an exclusive file lock, that records the tokens held by each
+# process and the queue of waiting processes.  Entries of dead processes are
+# dropped, so a crashed worker never leaks its tokens.
+#
+# Waiters are admitted in FIFO order with backfilling: a waiter is admitted
+# when its tokens fit next to the held tokens plus the tokens of all earlier
+# waiters.  So small requests still use spare capacity, but can never starve a
+# large request that queued before them.
+
+# engine usage is measured in 1080p streams
+STREAM_PIXELS = 1920 * 1080
+
+def classify(kind, width, height, frames, framesize, lowpower = False,
+    outputs = 1):
+  weight = max(0.25, (width * height) / float(STREAM_PIXELS))
+
+  tokens = dict()
+  if "decode" == kind:
+    tokens.update(vdbox = weight)
+  elif "encode" == kind:
+    # low power encoding (VDENC) does not use the render engine
+    tokens.update(vdbox = weight)
+    if not lowpower:
+      tokens.update(render = weight)
+  elif "vpp" == kind:
+    tokens.update(vebox = weight)
+  elif "transcode" == kind:
+    tokens.update(vdbox = weight * (1 + outputs), vebox = weight * outputs)
+
+  # surface pools of the pipeline and the decoded output written to disk
+  tokens.update(
+    memory = framesize * 32 * outputs,
+    disk = framesize * frames * outputs,
+  )
+  return tokens
+
+def parse_slots(spec):
+  # i.e. "vdbox=4,vebox=4,render=8"
+  slots = dict()
+  for item in spec.split(','):
+    name, value = item.split('=')
+    slots[name.strip()] = float(value)
+  return slots
+
+def get_memory_total():
+  with open("/proc/meminfo", "r") as fd:
+    for line in fd:
+      if line.startswith("MemTotal:"):
+        return int(line.split()[1]) * 1024
+  return 0
+
+def get_disk_free(path):
+  stat = os.statvfs(path)
+  return stat.f_bavail * stat.f_frsize
+
+def get_pool_dir():
+  return os.environ.get("VAAPI_FITS_RESOURCE_DIR", None) or os.path.join(
+    tempfile.gettempdir(), "vaapi-fits-resources")
+
+class ResourcePool:
+  def __init__(self, capacity, path = None, poll = 0.5):
+    self.capacity = capacity
+    self.path = path or get_pool_dir()
+    self.poll = poll
+    self.held = None
+    self.queued = False
+
+    if not os.path.exists(self.path):
+      try:
+        os.makedirs(self.path)
+        os.chmod(self.path, 01777) # shared by all users of the host
+      except OSError:
+        pass # created concurrently
+    self.ledger = os.path.join(self.path, "ledger.json")
+
+  @staticmethod
+  def __alive(pid):
+    try:
+      os.kill(pid, 0)
+    except OSError, e:
+      return e.errno == errno.EPERM
+    return True
+
+  def __transaction(self, update):
+    with open("{}.lock".format(self.ledger), "a") as lock:
+      fcntl.flock(lock, fcntl.LOCK_EX)
+
+      try:
+        with open(self.ledger, "r") as fd:
+          ledger = json.load(fd)
+      except (IOError, OSError, ValueError):
+        ledger = dict()
+
+      holders = dict(
+        (k, v) for k, v in ledger.get("holders", dict()).items()
+          if self.__alive(int(k)))
+      queue = [w for w in ledger.get("queue", list()) if self.__alive(int(w[0]))]
+      result = update(holders, queue)
+
+      with atomic_write(self.ledger, "w") as fd:
+        json.dump(dict(holders = holders, queue = queue), fd)
+
+      return result
+
+  def __fits(self, holders, tokens):
+    # an idle pool always admits, so that requests larger than the capacity
+    # can still run (alone)
+    if not len(holders):
+      return True
+    for name, amount in tokens.items():
+      capacity = self.capacity.get(name, None)
+      if capacity is None:
+        continue
+      used = sum(h.get(name, 0) for h in holders.values())
+      if used + amount > capacity:
+        return False
+    return True
+
+  # Take a place in the queue (kept until admitted or released) and return
+  # whether the tokens were admitted.
+  def try_acquire(self, tokens):
+    assert self.held is None, "resource tokens already held"
+    pid = str(os.getpid())
+    def update(holders, queue):
+      holders.pop(pid, None)
+      waiters = [w[0] for w in queue]
+      if pid not in waiters:
+        queue.append([pid, tokens])
+        waiters.append(pid)
+      position = waiters.index(pid)
+
+      # earlier waiters count as holders, see above
+      ahead = dict(holders)
+      ahead.update((w[0], w[1]) for w in queue[:position])
+      if self.__fits(ahead, tokens):
+        del queue[position]
+        holders[pid] = tokens
+        return True
+      return False
+    self.queued = not self.__transaction(update)
+    if not self.queued:
+      self.held = tokens
+    return not self.queued
+
+  # Block until tokens are available.  Returns the time waited in seconds.
+  def acquire(self, tokens):
+    start = time.time()
+    try:
+      while not self.try_acquire(tokens):
+        time.sleep(self.poll)
+    except:
+      self.release() # give up the place in the queue
+      raise
+    return time.time() - start
+
+  def release(self):
+    if self.held is None and not self.queued:
+      return
+    pid = str(os.getpid())
+    def update(holders, queue):
+      holders.pop(pid, None)
+      queue[:] = [w for w in queue if w[0] != pid]
+    self.__transaction(update)
+    self.held = None
+    self.queued = False
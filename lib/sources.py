@@ -0,0 +1,139 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+
+from capabilities import ENVIRONMENT, get_dependencies, which
+from common import get_temporary_name
+from metrics import md5
+
+# Cache of decoded source yuv files (i.e. the transcode reference).  Entries
+# are keyed by the source content, the tool binary, the plugins, libraries and
+# va driver it loads, the environment that decoded it, the complete decode
+# pipeline and the frame count, so a test only dumps its decoded source when no
+# earlier test (or session, when persistent) decoded the same source the same
+# way.
+#
+# The cache is bounded to maxsize bytes: the least recently used entries are
+# evicted, except those in use by a running test.  A test holds a shared lock
+# on the entries it looked up until it releases them (see release).  Locks are
+# taken on open files, so both sides check that the locked file is still the
+# entry (i.e. not unlinked by a concurrent eviction) before relying on it.
+
+class SourceCache:
+  def __init__(self, path, persistent = False, maxsize = 1024 * 1024 * 1024):
+    self.path = path
+    self.persistent = persistent
+    self.maxsize = maxsize
+    self.digests = dict()
+    self.held = list()
+
+  def __digest(self, source):
+    stat = os.stat(source)
+    key = (os.path.realpath(source), stat.st_size, stat.st_mtime)
+    if key not in self.digests:
+      self.digests[key] = md5(source)
+    return self.digests[key]
+
+  @staticmethod
+  def __is_entry(fd, filename):
+    st = os.fstat(fd.fileno())
+    try:
+      entry = os.stat(filename)
+    except OSError:
+      return False
+    return st.st_nlink > 0 and (st.st_dev, st.st_ino) == (
+      entry.st_dev, entry.st_ino)
+
+  def __hold(self, filename):
+    try:
+      fd = open(filename, "rb")
+    except IOError, e:
+      if e.errno == errno.ENOENT:
+        return False # evicted meanwhile
+      raise
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    if not self.__is_entry(fd, filename):
+      fd.close()
+      return False # evicted while waiting for the lock
+    self.held.append(fd)
+    return True
+
+  # Returns the cached yuv filename and, when it does not exist yet, the
+  # temporary filename to dump the decoded source to (see commit).
+  def lookup(self, tool, pipeline, source, frames):
+    binary = which(tool)
+    key = [
+      binary, os.stat(binary).st_mtime if binary is not None else None,
+      pipeline, self.__digest(source), frames,
+    ] + [os.environ.get(e, None) for e in ENVIRONMENT] + get_dependencies(tool)
+
+    filename = os.path.join(self.path, "{}.yuv".format(
+      hashlib.sha1(json.dumps(key)).hexdigest()))
+
+    if os.path.exists(filename) and self.__hold(filename):
+      os.utime(filename, None)
+      return filename, None
+
+    if not os.path.exists(self.path):
+      try:
+        os.makedirs(self.path)
+      except OSError:
+        pass # created by another worker
+    return filename, get_temporary_name(filename)
+
+  def commit(self, tmp, filename):
+    # concurrent workers may produce the same entry, the rename is atomic.  The
+    # entry is held before it is renamed, so it cannot be evicted before use.
+    if tmp is not None and os.path.exists(tmp):
+      self.__hold(tmp)
+      os.rename(tmp, filename)
+      self.__evict()
+
+  def discard(self, tmp):
+    if tmp is not None and os.path.exists(tmp):
+      os.remove(tmp)
+
+  # Release the entries held by the current test.
+  def release(self):
+    for fd in self.held:
+      fd.close()
+    self.held = list()
+
+  def __evict(self):
+    entries = list()
+    for name in os.listdir(self.path):
+      if not name.endswith(".yuv"):
+        continue
+      try:
+        st = os.stat(os.path.join(self.path, name))
+      except OSError: # evicted by another worker
+        continue
+      entries.append((st.st_mtime, st.st_size, os.path.join(self.path, name)))
+
+    size = sum(e[1] for e in entries)
+    for mtime, esize, filename in sorted(entries):
+      if size <= self.maxsize:
+        break
+      try:
+        with open(filename, "rb") as fd:
+          fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+          if not self.__is_entry(fd, filename):
+            continue # replaced or evicted by another worker
+          os.remove(filename)
+      except (IOError, OSError):
+        continue # in use, or evicted by another worker
+      size -= esize
+
+  def remove(self):
+    self.release()
+    if not self.persistent:
+      shutil.rmtree(self.path, ignore_errors = True)
@@ -4,17 +4,143 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
+import errno
+import json
+import os
+import re
 from common import call
 
+# Kernel log capture.  The kernel log is read through a cursor on /dev/kmsg (or
+# any file with the same record format), so each checkpoint only reads the
+# records added since the previous one.  Each record is a
+# "prio,seq,timestamp_us,flags;message" line, optionally followed by
+# continuation lines that start with a space.  When /dev/kmsg is not available,
+# the complete dmesg output is read on each checkpoint instead.
+
 class Capture:
-  def __init__(self):
+  def __init__(self, kmsg = "/dev/kmsg"):
     self.dmesg = list()
+    self.partial = ""
+    self.fd = None
+
+    try:
+      self.fd = os.open(kmsg, os.O_RDONLY | os.O_NONBLOCK)
+      os.lseek(self.fd, 0, os.SEEK_END)
+    except OSError:
+      if self.fd is not None:
+        os.close(self.fd)
+      self.fd = None
+
+  def close(self):
+    if self.fd is not None:
+      os.close(self.fd)
+      self.fd = None
+
+  @staticmethod
+  def __parse(line):
+    if not len(line) or line.startswith(' '):
+      return None # continuation line (i.e. " SUBSYSTEM=pci")
+    header, sep, message = line.partition(';')
+    fields = header.split(',')
+    if not len(sep) or len(fields) < 3:
+      return None
+    message = re.sub(
+      r"\\x([0-9a-fA-F]{2})", lambda m: chr(int(m.group(1), 16)), message)
+    return int(fields[1]), int(fields[2]), message
+
+  # Return the (seq, timestamp_us, message) kernel records added since the
+  # previous call.
+  def records(self):
+    assert self.fd is not None
+    data = list()
+    while True:
+      try:
+        chunk = os.read(self.fd, 8192)
+      except OSError, e:
+        if e.errno == errno.EPIPE:
+          continue # records were overwritten before we read them
+        if e.errno == errno.EAGAIN:
+          break
+        raise
+      if not len(chunk):
+        break
+      data.append(chunk)
+
+    lines = (self.partial + "".join(data)).split('\n')
+    self.partial = lines.pop()
+    return filter(None, map(self.__parse, lines))
 
   def __dmesg(self):
     self.dmesg = ["system(dmesg): {}".format(i) for i in call(
       "dmesg", False).strip().split('\n')]
 
   def checkpoint(self):
+    if self.fd is not None:
+      return '\n'.join([
+        "system(dmesg): [{:5d}.{:06d}] {}".format(
+          ts / 1000000, ts % 1000000, message)
+          for seq, ts, message in self.records()])
+
     last = len(self.dmesg)
     self.__dmesg()
     return '\n'.join(self.dmesg[last:]).strip()
+
+GPU_HANG_MESSAGES = [
+  "i915 0000:00:02.0: Resetting .* after gpu hang",
+  "i915 0000:00:02.0: Resetting .* for hang on .*",
+  "i915 0000:00:02.0: GPU HANG: .*",
+]
+
+def is_gpu_hang(message):
+  for msg in GPU_HANG_MESSAGES:
+    if re.search(msg, message, re.MULTILINE) is not None:
+      return True
+  return False
+
+# Call windows (test address, pid, start and end time) of all processes of a
+# session, appended to a shared file.  Used to attribute timestamped kernel
+# records to the tests that were running at the time (see attribute).
+class CallWindows:
+  def __init__(self, filename):
+    self.filename = filename
+
+  def add(self, address, pid, start, end):
+    # a single short O_APPEND write is not interleaved with other writers
+    line = json.dumps([address, pid, start, end]) + '\n'
+    fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+    try:
+      os.write(fd, line)
+    finally:
+      os.close(fd)
+
+  def load(self):
+    if not os.path.exists(self.filename):
+      return list()
+    with open(self.filename, "r") as fd:
+      return [json.loads(line) for line in fd if line.strip()]
+
+  def remove(self):
+    if os.path.exists(self.filename):
+      os.remove(self.filename)
+
+  # Map each gpu hang record to the tests whose calls overlapped it.  A hang is
+  # reported while the hung call still runs, but the kernel and user clocks
+  # may disagree slightly, so windows are widened by slack microseconds.  When
+  # the message names the hung process (i.e. "in ffmpeg [1234]"), only that
+  # process' calls are considered.
+  def attribute(self, records, slack = 1000000):
+    windows = self.load()
+    hangs = dict()
+    for seq, ts, message in records:
+      if not is_gpu_hang(message):
+        continue
+      candidates = [
+        w for w in windows if w[2] - slack <= ts <= w[3] + slack]
+      m = re.search(r"\[(\d+)\]", message)
+      if m is not None:
+        pids = [w for w in candidates if w[1] == int(m.group(1))]
+        candidates = pids or candidates
+      for address in set(w[0] for w in candidates):
+        hangs.setdefault(address, list()).append(
+          "[{:5d}.{:06d}] {}".format(ts / 1000000, ts % 1000000, message))
+    return hangs
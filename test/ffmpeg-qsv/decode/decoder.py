@@ -19,16 +19,17 @@ class DecoderTest(slash.Test):
     if self.mformat is None:
       slash.skip_test("{format} format not supported".format(**vars(self)))
 
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{case}_{width}x{height}_{format}.yuv".format(**vars(self)))
+    self.stream = stream_metric(**vars(self))
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
 
-    self.output = call(
+    self.output = call_stream(
       "ffmpeg -hwaccel qsv -hwaccel_device /dev/dri/renderD128 -v verbose"
       " -c:v {ffdecoder} -i {source} -vf 'hwdownload,format={hwformat}'"
       " -pix_fmt {mformat} -f rawvideo -vsync passthrough"
-      " -vframes {frames} -y {decoded}".format(**vars(self)))
+      " -vframes {frames} -".format(**vars(self)), self.stream)
 
     self.check_output()
     self.check_metrics()
@@ -113,22 +113,22 @@ class EncoderTest(slash.Test):
     assert m is not None, "It appears that the QSV plugin did not load"
 
   def check_metrics(self):
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{}-{width}x{height}-{format}.yuv".format(self.gen_name(), **vars(self)))
 
-    call(
+    params = dict(
+      metric = dict(type = "psnr"), reference = self.source,
+      decoded = self.decoded, width = self.width, height = self.height,
+      frames = self.frames, format = self.format, refctx = self.refctx)
+    stream = stream_metric(**params)
+
+    call_stream(
       "ffmpeg -hwaccel qsv -hwaccel_device /dev/dri/renderD128 -v verbose"
       " -c:v {ffdecoder} -i {encoded} -vf 'hwdownload,format={hwformat}'"
       " -pix_fmt {mformat} -f rawvideo -vsync passthrough -vframes {frames}"
-      " -y {decoded}".format(**vars(self)))
-
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.source, self.decoded,
-        self.width, self.height,
-        self.frames, self.format),
-      context = self.refctx,
-    )
+      " -".format(**vars(self)), stream)
+
+    check_metric(stream = stream, **params)
 
   def check_bitrate(self):
     if "cbr" == self.rcmode:
@@ -28,7 +28,7 @@ class JPEGEncoderTest(EncoderTest):
 ## a qsv mjpeg decoder is available.
 @memoize
 def have_ffmpeg_vaapi_accel():
-  return try_call("ffmpeg -hide_banner -hwaccels | grep vaapi")
+  return "vaapi" in ffmpeg_hwaccels()
 
 class cqp(JPEGEncoderTest):
   @platform_tags(JPEG_ENCODE_PLATFORMS)
@@ -50,18 +50,18 @@ class cqp(JPEGEncoderTest):
   ## NOTE: Temporary Workaround for qsv mjpeg encode test until
   ## a qsv mjpeg decoder is available.
   def check_metrics(self):
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{}-{width}x{height}-{format}.yuv".format(self.gen_name(), **vars(self)))
 
-    call(
+    params = dict(
+      metric = dict(type = "psnr"), reference = self.source,
+      decoded = self.decoded, width = self.width, height = self.height,
+      frames = self.frames, format = self.format, refctx = self.refctx)
+    stream = stream_metric(**params)
+
+    call_stream(
       "ffmpeg -hwaccel vaapi -vaapi_device /dev/dri/renderD128 -v verbose"
       " -i {encoded} -pix_fmt {mformat} -f rawvideo -vsync passthrough"
-      " -vframes {frames} -y {decoded}".format(**vars(self)))
+      " -vframes {frames} -".format(**vars(self)), stream)
 
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.source, self.decoded,
-        self.width, self.height,
-        self.frames, self.format),
-      context = self.refctx,
-    )
+    check_metric(stream = stream, **params)
@@ -189,13 +189,15 @@ class TranscoderTest(slash.Test):
         opts += " -vframes {frames}"
         opts += " -y {}".format(ofile)
 
-    # dump decoded source to yuv for reference comparison
-    self.srcyuv = get_media()._test_artifact(
-      "src_{case}.yuv".format(**vars(self)))
-    if "hw" == self.mode:
-      opts += " -vf 'hwdownload,format=nv12'"
-    opts += " -pix_fmt yuv420p -f rawvideo"
-    opts += " -vframes {frames} -y {srcyuv}"
+    # dump decoded source to yuv for reference comparison, unless an earlier
+    # test already decoded it the same way (see lib/sources.py)
+    self.srcyuv, self.srcdump = get_media().source_cache.lookup(
+      "ffmpeg", self.gen_input_opts(), self.source, self.frames)
+    if self.srcdump is not None:
+      if "hw" == self.mode:
+        opts += " -vf 'hwdownload,format=nv12'"
+      opts += " -pix_fmt yuv420p -f rawvideo"
+      opts += " -vframes {frames} -y {srcdump}"
 
     return opts.format(**vars(self))
 
@@ -214,29 +216,40 @@ class TranscoderTest(slash.Test):
     oopts = self.gen_output_opts()
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
-    self.output = call("ffmpeg -v verbose {} {}".format(iopts, oopts))
-
-    self.check_output()
-
+    try:
+      self.output = call("ffmpeg -v verbose {} {}".format(iopts, oopts))
+      self.check_output()
+      get_media().source_cache.commit(self.srcdump, self.srcyuv)
+    finally:
+      get_media().source_cache.discard(self.srcdump)
+    get_media()._cached_artifact(
+      self.srcyuv, "src_{case}.yuv".format(**vars(self)))
+
+    # decode all outputs concurrently, each streamed into its own metric
+    jobs, checks = list(), list()
     for n, output in enumerate(self.outputs):
       for channel in xrange(output.get("channels", 1)):
         encoded = self.goutputs[n][channel]
-        yuv = get_media()._test_artifact(
+        yuv = get_media()._stream_artifact(
           "{}_{}_{}.yuv".format(self.case, n, channel))
+        stream = stream_metric(
+          metric = dict(type = "psnr"), reference = self.srcyuv,
+          decoded = yuv, width = self.width, height = self.height,
+          frames = self.frames, format = "I420")
         vppscale = self.get_vpp_scale(self.width, self.height, "sw")
-        call(
+        jobs.append((
           "ffmpeg -v verbose -i {} -vf '{}' -pix_fmt yuv420p -f rawvideo"
-          " -vframes {} -y {}".format(
-            encoded, vppscale, self.frames, yuv))
-        self.check_metrics(yuv, refctx = [(n, channel)])
-        # delete yuv file after each iteration
-        get_media()._purge_test_artifact(yuv)
-
-  def check_metrics(self, yuv, refctx):
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.srcyuv, yuv,
-        self.width, self.height,
-        self.frames),
-      context = self.refctx + refctx,
+          " -vframes {} -".format(encoded, vppscale, self.frames), stream))
+        checks.append((stream, [(n, channel)], yuv))
+
+    call_stream_all(jobs)
+
+    for stream, refctx, yuv in checks:
+      self.check_metrics(stream, refctx = refctx)
+      get_media()._purge_test_artifact(yuv)
+
+  def check_metrics(self, stream, refctx):
+    check_metric(
+      metric = dict(type = "psnr"), stream = stream,
+      refctx = self.refctx + refctx,
     )
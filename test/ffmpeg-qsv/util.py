@@ -4,84 +4,86 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
-from ...lib.common import memoize, try_call, get_media
+from ...lib.capabilities import ffmpeg_decoders, ffmpeg_encoders, ffmpeg_filters
+from ...lib.capabilities import ffmpeg_hwaccels, which
+from ...lib.common import memoize, get_media
 
 def using_compatible_driver():
   return get_media()._get_driver_name() == "iHD"
 
 @memoize
 def have_ffmpeg():
-  return try_call("which ffmpeg")
+  return which("ffmpeg") is not None
 
 @memoize
 def have_ffmpeg_qsv_accel():
-  return try_call("ffmpeg -hide_banner -hwaccels | grep qsv")
+  return "qsv" in ffmpeg_hwaccels()
 
 @memoize
 def have_ffmpeg_h264_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep h264_qsv")
+  return "h264_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_hevc_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep hevc_qsv")
+  return "hevc_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_mjpeg_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep mjpeg_qsv")
+  return "mjpeg_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_mpeg2_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep mpeg2_qsv")
+  return "mpeg2_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_vc1_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep vc1_qsv")
+  return "vc1_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_vp8_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep vp8_qsv")
+  return "vp8_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_vp9_qsv_decode():
-  return try_call("ffmpeg -hide_banner -decoders | grep vp9_qsv")
+  return "vp9_qsv" in ffmpeg_decoders()
 
 @memoize
 def have_ffmpeg_h264_qsv_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep h264_qsv")
+  return "h264_qsv" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_x264_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep libx264")
+  return "libx264" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_hevc_qsv_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep hevc_qsv")
+  return "hevc_qsv" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_x265_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep libx265")
+  return "libx265" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_mjpeg_qsv_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep mjpeg_qsv")
+  return "mjpeg_qsv" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_mpeg2_qsv_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep mpeg2_qsv")
+  return "mpeg2_qsv" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_filter(name):
-  result = try_call("ffmpeg -hide_banner -filters | awk '{{print $2}}' | grep -w {}".format(name))
+  result = name in ffmpeg_filters()
   return result, name
 
 @memoize
 def have_ffmpeg_encoder(encoder):
-  result = try_call("ffmpeg -hide_banner -encoders | awk '{{print $2}}' | grep -w {}".format(encoder))
+  result = encoder in ffmpeg_encoders()
   return result, encoder
 
 @memoize
 def have_ffmpeg_decoder(decoder):
-  result = try_call("ffmpeg -hide_banner -decoders | awk '{{print $2}}' | grep -w {}".format(decoder))
+  result = decoder in ffmpeg_decoders()
   return result, decoder
 
 @memoize
@@ -146,10 +148,11 @@ def mapprofile(codec, profile):
 
 def load_test_spec(*ctx):
   from ...lib import get_media
+  from ...lib.assets import TestSpec
   import copy
 
   # get copy of general ctx entries
-  spec = copy.deepcopy(get_media()._get_test_spec(*ctx))
+  spec = TestSpec(copy.deepcopy(get_media()._get_test_spec(*ctx)))
 
   # component specific entries override general ctx entries
   spec.update(get_media()._get_test_spec("ffmpeg-qsv", *ctx))
@@ -22,3 +22,29 @@ class default(DecoderTest):
     vars(self).update(spec[case].copy())
     self.case = case
     self.decode()
+
+@benchmark
+class perf(DecoderTest):
+  def before(self):
+    super(perf, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_DECODE_PLATFORMS)
+  @slash.parametrize(("case"), sorted(spec.keys()))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    self.case = case
+    self.throughput()
+
+@benchmark
+class calltime(DecoderTest):
+  def before(self):
+    super(calltime, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_DECODE_PLATFORMS)
+  @slash.parametrize(("case"), sorted(spec.keys()))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    self.case = case
+    self.calltime()
@@ -18,19 +18,46 @@ class DecoderTest(slash.Test):
     if self.mformat is None:
       slash.skip_test("{format} format not supported".format(**vars(self)))
 
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{case}_{width}x{height}_{format}.yuv".format(**vars(self)))
+    self.stream = stream_metric(**vars(self))
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
 
-    self.output = call(
+    self.output = call_stream(
       "ffmpeg -hwaccel vaapi -hwaccel_device /dev/dri/renderD128 -v verbose"
       " -i {source} -pix_fmt {mformat} -f rawvideo -vsync passthrough"
-      " -vframes {frames} -y {decoded}".format(**vars(self)))
+      " -vframes {frames} -".format(**vars(self)), self.stream)
 
     self.check_output()
     self.check_metrics()
 
+  # decode into a null sink, the surfaces are not downloaded
+  def decode_null(self, opts):
+    get_media().test_call_timeout = vars(self).get("call_timeout", 0)
+
+    self.output = call(
+      "ffmpeg -hwaccel vaapi -hwaccel_device /dev/dri/renderD128 -v verbose"
+      " -hwaccel_output_format vaapi {opts} -i {source}"
+      " -vsync passthrough -vframes {frames} -f null -".format(
+        opts = opts, **vars(self)))
+
+    self.check_output()
+
+  # see perf metric
+  def throughput(self):
+    self.decode_null("-benchmark")
+    check_metric(
+      metric = dict(type = "perf"), output = self.output,
+      frames = self.frames, refctx = self.refctx)
+
+  # see calltime metric
+  def calltime(self):
+    self.decode_null("-benchmark_all")
+    check_metric(
+      metric = dict(type = "calltime", stage = "decode_video"),
+      output = self.output, refctx = self.refctx)
+
   def check_output(self):
     m = re.search(
       "not supported for hardware decode", self.output, re.MULTILINE)
@@ -45,3 +45,17 @@ class default(DecoderTest):
     vars(self).update(spec[case].copy())
     self.case = case
     self.decode()
+
+@benchmark
+class perf(DecoderTest):
+  def before(self):
+    super(perf, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(HEVC_DECODE_8BIT_PLATFORMS)
+  @slash.parametrize(("case"), sorted([k for k,v in spec.items() if v["width"] <= 4096
+    and v["height"] <= 4096 and v["format"] in mapsubsampling("FORMATS_420")]))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    self.case = case
+    self.throughput()
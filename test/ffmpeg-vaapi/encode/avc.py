@@ -151,3 +151,50 @@ class vbr_lp(AVCEncoderTest):
       slices    = slices,
     )
     self.encode()
+
+@benchmark
+class calltime(AVCEncoderTest):
+  def before(self):
+    super(calltime, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_ENCODE_PLATFORMS)
+  @slash.requires(have_ffmpeg_h264_vaapi_encode)
+  @slash.parametrize(*gen_avc_cqp_parameters(spec, ['high', 'main']))
+  def test(self, case, gop, slices, bframes, qp, quality, profile):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      bframes   = bframes,
+      case      = case,
+      gop       = gop,
+      lowpower  = 0,
+      profile   = profile,
+      qp        = qp,
+      quality   = quality,
+      rcmode    = "cqp",
+      slices    = slices,
+    )
+    self.calltime()
+
+@benchmark
+class calltime_lp(AVCEncoderTest):
+  def before(self):
+    super(calltime_lp, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_ENCODE_CQP_LP_PLATFORMS)
+  @slash.requires(have_ffmpeg_h264_vaapi_encode)
+  @slash.parametrize(*gen_avc_cqp_lp_parameters(spec, ['high', 'main']))
+  def test(self, case, gop, slices, qp, quality, profile):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case      = case,
+      gop       = gop,
+      lowpower  = 1,
+      profile   = profile,
+      qp        = qp,
+      quality   = quality,
+      rcmode    = "cqp",
+      slices    = slices,
+    )
+    self.calltime()
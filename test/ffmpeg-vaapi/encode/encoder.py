@@ -96,7 +96,7 @@ class EncoderTest(slash.Test):
   def before(self):
     self.refctx = []
 
-  def encode(self):
+  def call_encode(self, opts = ""):
     self.mprofile = mapprofile(self.codec, self.profile)
     if self.mprofile is None:
       slash.skip_test("{profile} profile is not supported".format(**vars(self)))
@@ -115,12 +115,22 @@ class EncoderTest(slash.Test):
 
     self.output = call(
       "ffmpeg -hwaccel vaapi -vaapi_device /dev/dri/renderD128 -v verbose"
-      " {iopts} {oopts}".format(iopts = iopts, oopts = oopts))
+      " {opts} {iopts} {oopts}".format(opts = opts, iopts = iopts, oopts = oopts))
 
     self.check_output()
+
+  def encode(self):
+    self.call_encode()
     self.check_bitrate()
     self.check_metrics()
 
+  # per-frame encode call time (see calltime metric)
+  def calltime(self):
+    self.call_encode("-benchmark_all")
+    check_metric(
+      metric = dict(type = "calltime", stage = "encode_video"),
+      output = self.output, refctx = self.refctx)
+
   def check_output(self):
     # profile
     m = re.search(
@@ -162,21 +172,21 @@ class EncoderTest(slash.Test):
     assert m is not None, "Possible incorrect IPB mode used"
 
   def check_metrics(self):
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{}-{width}x{height}-{format}.yuv".format(self.gen_name(), **vars(self)))
 
-    call(
+    params = dict(
+      metric = dict(type = "psnr"), reference = self.source,
+      decoded = self.decoded, width = self.width, height = self.height,
+      frames = self.frames, format = self.format, refctx = self.refctx)
+    stream = stream_metric(**params)
+
+    call_stream(
       "ffmpeg -hwaccel vaapi -vaapi_device /dev/dri/renderD128 -v verbose"
       " -i {encoded} -pix_fmt {mformat} -f rawvideo -vsync passthrough"
-      " -vframes {frames} -y {decoded}".format(**vars(self)))
-
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.source, self.decoded,
-        self.width, self.height,
-        self.frames, self.format),
-      context = self.refctx,
-    )
+      " -vframes {frames} -".format(**vars(self)), stream)
+
+    check_metric(stream = stream, **params)
 
   def check_bitrate(self):
     if "cbr" == self.rcmode:
@@ -6,7 +6,7 @@
 
 from ....lib import *
 from ..util import *
-from .transcoder import TranscoderTest
+from .transcoder import TranscoderTest, density_cases
 
 spec = load_test_spec("avc", "transcode")
 
@@ -20,3 +20,13 @@ class default(TranscoderTest):
     )
     self.transcode()
 
+@benchmark
+class density(TranscoderTest):
+  @slash.parametrize(("case"), density_cases(spec))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case  = case,
+      codec = "avc",
+    )
+    self.density()
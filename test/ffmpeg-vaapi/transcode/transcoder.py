@@ -8,6 +8,11 @@ from ....lib import *
 from ..util import *
 import os
 
+# The cases of spec that only use the hardware, i.e. the density cases
+def density_cases(spec):
+  return sorted([k for k,v in spec.items() if "hw" == v["mode"]
+    and all(["hw" == o["mode"] for o in v["outputs"]])])
+
 @slash.requires(have_ffmpeg)
 @slash.requires(have_ffmpeg_vaapi_accel)
 @platform_tags(ALL_PLATFORMS)
@@ -135,6 +140,9 @@ class TranscoderTest(slash.Test):
     if pmatch and not any(map(lambda p: any([m.matches(p) for m in matchers]), platforms)):
       slash.skip_test("unsupported platform")
 
+    # the platforms this case runs on (see density)
+    self.platforms = get_selected_platforms(platforms)
+
     # check required
     if not all([t for t,m in requires]):
       slash.skip_test(
@@ -151,32 +159,35 @@ class TranscoderTest(slash.Test):
 
     return opts.format(**vars(self))
 
-  def gen_output_opts(self):
-    self.goutputs = dict()
+  def get_output_filters(self, output):
+    mode = output["mode"]
+    filters = []
+    tmode = (self.mode, mode)
 
-    opts = "-an"
+    if ("hw", "sw") == tmode:   # HW to SW transcode
+      filters.extend(["hwdownload", "format=nv12"])
+    elif ("sw", "hw") == tmode: # SW to HW transcode
+      filters.append("format=nv12")
 
-    for n, output in enumerate(self.outputs):
-      codec = output["codec"]
-      mode = output["mode"]
-      encoder = self.get_encoder(codec, mode)
-      ext = self.get_file_ext(codec)
+    if "hw" == mode:            # SW/HW to HW transcode
+      filters.append("hwupload")
 
-      filters = []
-      tmode = (self.mode, mode)
+    vppscale = self.get_vpp_scale(
+      output.get("width", None), output.get("height", None), mode)
+    if vppscale is not None:
+      filters.append(vppscale)
 
-      if ("hw", "sw") == tmode:   # HW to SW transcode
-        filters.extend(["hwdownload", "format=nv12"])
-      elif ("sw", "hw") == tmode: # SW to HW transcode
-        filters.append("format=nv12")
+    return filters
 
-      if "hw" == mode:            # SW/HW to HW transcode
-        filters.append("hwupload")
+  def gen_output_opts(self):
+    self.goutputs = dict()
+
+    opts = "-an"
 
-      vppscale = self.get_vpp_scale(
-        output.get("width", None), output.get("height", None), mode)
-      if vppscale is not None:
-        filters.append(vppscale)
+    for n, output in enumerate(self.outputs):
+      encoder = self.get_encoder(output["codec"], output["mode"])
+      ext = self.get_file_ext(output["codec"])
+      filters = self.get_output_filters(output)
 
       for channel in xrange(output.get("channels", 1)):
         ofile = get_media()._test_artifact(
@@ -189,13 +200,15 @@ class TranscoderTest(slash.Test):
         opts += " -vframes {frames}"
         opts += " -y {}".format(ofile)
 
-    # dump decoded source to yuv for reference comparison
-    self.srcyuv = get_media()._test_artifact(
-      "src_{case}.yuv".format(**vars(self)))
-    if "hw" == self.mode:
-      opts += " -vf 'hwdownload,format=nv12'"
-    opts += " -pix_fmt yuv420p -f rawvideo"
-    opts += " -vframes {frames} -y {srcyuv}"
+    # dump decoded source to yuv for reference comparison, unless an earlier
+    # test already decoded it the same way (see lib/sources.py)
+    self.srcyuv, self.srcdump = get_media().source_cache.lookup(
+      "ffmpeg", self.gen_input_opts(), self.source, self.frames)
+    if self.srcdump is not None:
+      if "hw" == self.mode:
+        opts += " -vf 'hwdownload,format=nv12'"
+      opts += " -pix_fmt yuv420p -f rawvideo"
+      opts += " -vframes {frames} -y {srcdump}"
 
     return opts.format(**vars(self))
 
@@ -214,29 +227,106 @@ class TranscoderTest(slash.Test):
     oopts = self.gen_output_opts()
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
-    self.output = call("ffmpeg -v verbose {} {}".format(iopts, oopts))
-
-    self.check_output()
-
+    try:
+      self.output = call("ffmpeg -v verbose {} {}".format(iopts, oopts))
+      self.check_output()
+      get_media().source_cache.commit(self.srcdump, self.srcyuv)
+    finally:
+      get_media().source_cache.discard(self.srcdump)
+    get_media()._cached_artifact(
+      self.srcyuv, "src_{case}.yuv".format(**vars(self)))
+
+    # decode all outputs concurrently, each streamed into its own metric
+    jobs, checks = list(), list()
     for n, output in enumerate(self.outputs):
       for channel in xrange(output.get("channels", 1)):
         encoded = self.goutputs[n][channel]
-        yuv = get_media()._test_artifact(
+        yuv = get_media()._stream_artifact(
           "{}_{}_{}.yuv".format(self.case, n, channel))
+        stream = stream_metric(
+          metric = dict(type = "psnr"), reference = self.srcyuv,
+          decoded = yuv, width = self.width, height = self.height,
+          frames = self.frames, format = "I420")
         vppscale = self.get_vpp_scale(self.width, self.height, "sw")
-        call(
+        jobs.append((
           "ffmpeg -v verbose -i {} -vf '{}' -pix_fmt yuv420p -f rawvideo"
-          " -vframes {} -y {}".format(
-            encoded, vppscale, self.frames, yuv))
-        self.check_metrics(yuv, refctx = [(n, channel)])
-        # delete yuv file after each iteration
-        get_media()._purge_test_artifact(yuv)
-
-  def check_metrics(self, yuv, refctx):
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.srcyuv, yuv,
-        self.width, self.height,
-        self.frames),
-      context = self.refctx + refctx,
+          " -vframes {} -".format(encoded, vppscale, self.frames), stream))
+        checks.append((stream, [(n, channel)], yuv))
+
+    call_stream_all(jobs)
+
+    for stream, refctx, yuv in checks:
+      self.check_metrics(stream, refctx = refctx)
+      get_media()._purge_test_artifact(yuv)
+
+  # One density channel decodes the (looped) source and encodes it once per
+  # output into null sinks, so nothing is written to disk.
+  def gen_density_opts(self):
+    opts = "-stream_loop -1 {}".format(self.gen_input_opts())
+    opts += " -an"
+
+    for output in self.outputs:
+      filters = self.get_output_filters(output)
+      if len(filters):
+        opts += " -vf '{}'".format(','.join(filters))
+      opts += " -c:v {}".format(
+        self.get_encoder(output["codec"], output["mode"]))
+      opts += " -vframes {} -f null -".format(self.dframes)
+
+    return opts
+
+  # Run channels concurrently, True when all of them sustain the target fps.
+  def sustains(self, channels):
+    outputs = call_stream_all(
+      [("ffmpeg -v verbose -benchmark {}".format(self.dopts), None)]
+        * channels, limit = channels)
+    for output in outputs:
+      self.output = output
+      self.check_output()
+
+    fps = [parse_fps(output, self.dframes) for output in outputs]
+    assert None not in fps, "no benchmark timing in output"
+    fps = [round(f, 2) for f in fps]
+    get_media()._set_test_details(**{"density.fps.{}".format(channels) : fps})
+    return min(fps) >= self.dfps
+
+  # Find the maximum number of concurrent channels that sustain the target
+  # fps: ramp up exponentially until a channel count misses it, then binary
+  # search between the last sustained and the first missed channel count.
+  def density(self):
+    self.validate_spec()
+
+    density = vars(self).get("density", dict())
+    self.dfps = density.get("fps", 30)
+    self.dframes = density.get("frames", 300)
+    self.dmax = density.get("max", 32)
+    self.dopts = self.gen_density_opts()
+
+    get_media().test_call_timeout = vars(self).get("call_timeout", 0)
+
+    lo, hi = 0, self.dmax + 1
+    while lo < self.dmax and hi > self.dmax:
+      n = min(max(1, lo * 2), self.dmax)
+      if self.sustains(n):
+        lo = n
+      else:
+        hi = n
+    while hi - lo > 1:
+      n = (lo + hi) / 2
+      if self.sustains(n):
+        lo = n
+      else:
+        hi = n
+
+    refctx = ["platform.{}".format('+'.join(self.platforms))] if len(
+      self.platforms) else []
+    get_media()._set_test_details(
+      density = "{} channels at {} fps".format(lo, self.dfps))
+    get_media().baseline.check_density(
+      channels = lo, context = self.refctx + refctx)
+
+  def check_metrics(self, stream, refctx):
+    check_metric(
+      metric = dict(type = "psnr"), stream = stream,
+      refctx = self.refctx + refctx,
     )
@@ -6,7 +6,7 @@
 
 from ....lib import *
 from ..util import *
-from .transcoder import TranscoderTest
+from .transcoder import TranscoderTest, density_cases
 
 spec = load_test_spec("vc1", "transcode")
 
@@ -19,3 +19,14 @@ class default(TranscoderTest):
       codec = "vc1",
     )
     self.transcode()
+
+@benchmark
+class density(TranscoderTest):
+  @slash.parametrize(("case"), density_cases(spec))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case  = case,
+      codec = "vc1",
+    )
+    self.density()
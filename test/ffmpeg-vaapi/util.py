@@ -4,56 +4,58 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
-from ...lib.common import memoize, try_call
+from ...lib.capabilities import ffmpeg_decoders, ffmpeg_encoders, ffmpeg_filters
+from ...lib.capabilities import ffmpeg_hwaccels, which
+from ...lib.common import memoize
 
 @memoize
 def have_ffmpeg():
-  return try_call("which ffmpeg")
+  return which("ffmpeg") is not None
 
 @memoize
 def have_ffmpeg_vaapi_accel():
-  return try_call("ffmpeg -hide_banner -hwaccels | grep vaapi")
+  return "vaapi" in ffmpeg_hwaccels()
 
 @memoize
 def have_ffmpeg_h264_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep h264_vaapi")
+  return "h264_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_hevc_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep hevc_vaapi")
+  return "hevc_vaapi" in ffmpeg_encoders()
 
 def have_ffmpeg_mjpeg_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep mjpeg_vaapi")
+  return "mjpeg_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_mpeg2_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep mpeg2_vaapi")
+  return "mpeg2_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_vc1_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep vc1_vaapi")
+  return "vc1_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_vp8_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep vp8_vaapi")
+  return "vp8_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_vp9_vaapi_encode():
-  return try_call("ffmpeg -hide_banner -encoders | grep vp9_vaapi")
+  return "vp9_vaapi" in ffmpeg_encoders()
 
 @memoize
 def have_ffmpeg_filter(name):
-  result = try_call("ffmpeg -hide_banner -filters | awk '{{print $2}}' | grep -w {}".format(name))
+  result = name in ffmpeg_filters()
   return result, name
 
 @memoize
 def have_ffmpeg_encoder(encoder):
-  result = try_call("ffmpeg -hide_banner -encoders | awk '{{print $2}}' | grep -w {}".format(encoder))
+  result = encoder in ffmpeg_encoders()
   return result, encoder
 
 @memoize
 def have_ffmpeg_decoder(decoder):
-  result = try_call("ffmpeg -hide_banner -decoders | awk '{{print $2}}' | grep -w {}".format(decoder))
+  result = decoder in ffmpeg_decoders()
   return result, decoder
 
 @memoize
@@ -121,10 +123,11 @@ def mapprofile(codec, profile):
 
 def load_test_spec(*ctx):
   from ...lib import get_media
+  from ...lib.assets import TestSpec
   import copy
 
   # get copy of general ctx entries
-  spec = copy.deepcopy(get_media()._get_test_spec(*ctx))
+  spec = TestSpec(copy.deepcopy(get_media()._get_test_spec(*ctx)))
 
   # component specific entries override general ctx entries
   spec.update(get_media()._get_test_spec("ffmpeg-vaapi", *ctx))
@@ -20,8 +20,9 @@ class DecoderTest(slash.Test):
     if self.mformatu is None:
       slash.skip_test("{format} format not supported".format(**vars(self)))
 
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{case}_{width}x{height}_{format}.yuv".format(**vars(self)))
+    self.stream = stream_metric(**vars(self))
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
 
@@ -31,12 +32,12 @@ class DecoderTest(slash.Test):
         " ! videoscale"
         " ! video/x-raw,width={width},height={height}".format(**vars(self)))
 
-    call(
+    call_stream(
       "gst-launch-1.0 -vf filesrc location={source}"
       " ! {gstdecoder} ! videoconvert ! video/x-raw,format={mformatu}"
       " {gstscaler} ! checksumsink2 file-checksum=false qos=false"
       " frame-checksum=false plane-checksum=false dump-output=true"
-      " dump-location={decoded}".format(**vars(self)))
+      " dump-location=/dev/fd/3".format(**vars(self)), self.stream, fd = 3)
 
     self.check_metrics()
 
@@ -134,24 +134,24 @@ class EncoderTest(slash.Test):
     self.check_metrics()
 
   def check_metrics(self):
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{}-{width}x{height}-{format}.yuv".format(self.gen_name(), **vars(self)))
 
-    call(
+    params = dict(
+      metric = dict(type = "psnr"), reference = self.source,
+      decoded = self.decoded, width = self.width, height = self.height,
+      frames = self.frames, format = self.format, refctx = self.refctx)
+    stream = stream_metric(**params)
+
+    call_stream(
       "gst-launch-1.0 -vf filesrc location={encoded}"
       " ! {gstdecoder}"
       " ! videoconvert ! video/x-raw,format={mformatu}"
-      " ! checksumsink2 file-checksum=false frame-checksum=false"
-      " plane-checksum=false dump-output=true qos=false"
-      " dump-location={decoded}".format(**vars(self))
-    )
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.source, self.decoded,
-        self.width, self.height,
-        self.frames, self.format),
-      context = self.refctx,
-    )
+      " ! checksumsink2 file-checksum=false qos=false"
+      " frame-checksum=false plane-checksum=false dump-output=true"
+      " dump-location=/dev/fd/3".format(**vars(self)), stream, fd = 3)
+
+    check_metric(stream = stream, **params)
 
   def check_bitrate(self):
     if "cbr" == self.rcmode:
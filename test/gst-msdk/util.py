@@ -4,66 +4,67 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
-from ...lib.common import memoize, try_call, get_media
+from ...lib.capabilities import gst_features, which
+from ...lib.common import memoize, get_media
 
 def using_compatible_driver():
   return get_media()._get_driver_name() == "iHD"
 
 @memoize
 def have_gst():
-  return try_call("which gst-launch-1.0") and try_call("which gst-inspect-1.0")
+  return which("gst-launch-1.0") is not None and which("gst-inspect-1.0") is not None
 
 @memoize
 def have_gst_msdk():
-  return try_call("gst-inspect-1.0 msdk")
+  return "msdk" in gst_features()
 
 @memoize
 def have_gst_msdkh264dec():
-  return try_call("gst-inspect-1.0 msdkh264dec")
+  return "msdkh264dec" in gst_features()
 
 @memoize
 def have_gst_msdkh265dec():
-  return try_call("gst-inspect-1.0 msdkh265dec")
+  return "msdkh265dec" in gst_features()
 
 @memoize
 def have_gst_msdkmjpegdec():
-  return try_call("gst-inspect-1.0 msdkmjpegdec")
+  return "msdkmjpegdec" in gst_features()
 
 @memoize
 def have_gst_msdkmpeg2dec():
-  return try_call("gst-inspect-1.0 msdkmpeg2dec")
+  return "msdkmpeg2dec" in gst_features()
 
 @memoize
 def have_gst_msdkvc1dec():
-  return try_call("gst-inspect-1.0 msdkvc1dec")
+  return "msdkvc1dec" in gst_features()
 
 @memoize
 def have_gst_msdkvp8dec():
-  return try_call("gst-inspect-1.0 msdkvp8dec")
+  return "msdkvp8dec" in gst_features()
 
 @memoize
 def have_gst_msdkh264enc():
-  return try_call("gst-inspect-1.0 msdkh264enc")
+  return "msdkh264enc" in gst_features()
 
 @memoize
 def have_gst_msdkh265enc():
-  return try_call("gst-inspect-1.0 msdkh265enc")
+  return "msdkh265enc" in gst_features()
 
 @memoize
 def have_gst_msdkmjpegenc():
-  return try_call("gst-inspect-1.0 msdkmjpegenc")
+  return "msdkmjpegenc" in gst_features()
 
 @memoize
 def have_gst_msdkmpeg2enc():
-  return try_call("gst-inspect-1.0 msdkmpeg2enc")
+  return "msdkmpeg2enc" in gst_features()
 
 @memoize
 def have_gst_msdkvp8enc():
-  return try_call("gst-inspect-1.0 msdkvp8enc")
+  return "msdkvp8enc" in gst_features()
 
 @memoize
 def have_gst_element(element):
-  result = try_call("gst-inspect-1.0 {}".format(element))
+  result = element in gst_features()
   return result, element
 
 @memoize
@@ -168,10 +169,11 @@ def mapprofile(codec,profile):
 
 def load_test_spec(*ctx):
   from ...lib import get_media
+  from ...lib.assets import TestSpec
   import copy
 
   # get copy of general ctx entries
-  spec = copy.deepcopy(get_media()._get_test_spec(*ctx))
+  spec = TestSpec(copy.deepcopy(get_media()._get_test_spec(*ctx)))
 
   # component specific entries override general ctx entries
   spec.update(get_media()._get_test_spec("gst-msdk", *ctx))
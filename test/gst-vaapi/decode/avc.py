@@ -26,3 +26,37 @@ class default(DecoderTest):
       gstdecoder  = "h264parse ! vaapih264dec",
     )
     self.decode()
+
+@benchmark
+class perf(DecoderTest):
+  def before(self):
+    super(perf, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_DECODE_PLATFORMS)
+  @slash.requires(*have_gst_element("vaapih264dec"))
+  @slash.parametrize(("case"), sorted(spec.keys()))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case        = case,
+      gstdecoder  = "h264parse ! vaapih264dec",
+    )
+    self.throughput()
+
+@benchmark
+class latency(DecoderTest):
+  def before(self):
+    super(latency, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_DECODE_PLATFORMS)
+  @slash.requires(*have_gst_element("vaapih264dec"))
+  @slash.parametrize(("case"), sorted(spec.keys()))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case        = case,
+      gstdecoder  = "h264parse ! vaapih264dec",
+    )
+    self.latency()
@@ -19,8 +19,9 @@ class DecoderTest(slash.Test):
     if self.mformatu is None:
       slash.skip_test("{format} format not supported".format(**vars(self)))
 
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{case}_{width}x{height}_{format}.yuv".format(**vars(self)))
+    self.stream = stream_metric(**vars(self))
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
     self.gstscaler = ""
@@ -29,15 +30,40 @@ class DecoderTest(slash.Test):
         " ! videoscale"
         " ! video/x-raw,width={width},height={height}".format(**vars(self)))
 
-    call(
+    call_stream(
       "gst-launch-1.0 -vf filesrc location={source}"
       " ! {gstdecoder}"
       " ! videoconvert ! video/x-raw,format={mformatu} {gstscaler}"
       " ! checksumsink2 file-checksum=false qos=false"
       " frame-checksum=false plane-checksum=false dump-output=true"
-      " dump-location={decoded}".format(**vars(self)))
+      " dump-location=/dev/fd/3".format(**vars(self)), self.stream, fd = 3)
 
     self.check_metrics()
 
+  # decode into a null sink, the surfaces are not downloaded.  The sink ends
+  # the pipeline after frames buffers, like ffmpeg -vframes, so that the fps
+  # of the perf metric is based on the frames actually decoded.
+  def decode_null(self, env = ""):
+    get_media().test_call_timeout = vars(self).get("call_timeout", 0)
+
+    self.output = call(
+      "env {env} gst-launch-1.0 -vf filesrc location={source}"
+      " ! {gstdecoder} ! fakesink sync=false num-buffers={frames}".format(
+        env = env, **vars(self)))
+
+  # see perf metric
+  def throughput(self):
+    self.decode_null()
+    check_metric(
+      metric = dict(type = "perf"), output = self.output,
+      frames = self.frames, refctx = self.refctx)
+
+  # see latency metric
+  def latency(self):
+    self.decode_null("GST_TRACERS=latency GST_DEBUG=GST_TRACER:7")
+    check_metric(
+      metric = dict(type = "latency"), output = self.output,
+      refctx = self.refctx)
+
   def check_metrics(self):
     check_metric(**vars(self))
@@ -61,3 +61,21 @@ class default(DecoderTest):
       gstdecoder  = "h265parse ! vaapih265dec",
     )
     self.decode()
+
+@benchmark
+class perf(DecoderTest):
+  def before(self):
+    super(perf, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(HEVC_DECODE_8BIT_PLATFORMS)
+  @slash.requires(*have_gst_element("vaapih265dec"))
+  @slash.parametrize(("case"), sorted([k for k,v in spec.items() if v["width"] <= 4096
+    and v["height"] <= 4096 and v["format"] in mapsubsampling("FORMATS_420")]))
+  def test(self, case):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case        = case,
+      gstdecoder  = "h265parse ! vaapih265dec",
+    )
+    self.throughput()
@@ -156,3 +156,50 @@ class vbr_lp(AVCEncoderTest):
       slices    = slices,
     )
     self.encode()
+
+@benchmark
+class latency(AVCEncoderTest):
+  def before(self):
+    super(latency, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_ENCODE_PLATFORMS)
+  @slash.requires(*have_gst_element("vaapih264enc"))
+  @slash.parametrize(*gen_avc_cqp_parameters(spec, ['main', 'high']))
+  def test(self, case, gop, slices, bframes, qp, quality, profile):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      bframes   = bframes,
+      case      = case,
+      gop       = gop,
+      lowpower  = False,
+      profile   = profile,
+      qp        = qp,
+      quality   = quality,
+      rcmode    = "cqp",
+      slices    = slices,
+    )
+    self.latency()
+
+@benchmark
+class latency_lp(AVCEncoderTest):
+  def before(self):
+    super(latency_lp, self).before()
+    self.refctx = ["driver"]
+
+  @platform_tags(AVC_ENCODE_CQP_LP_PLATFORMS)
+  @slash.requires(*have_gst_element("vaapih264enc"))
+  @slash.parametrize(*gen_avc_cqp_lp_parameters(spec, ['high', 'main']))
+  def test(self, case, gop, slices, qp, quality, profile):
+    vars(self).update(spec[case].copy())
+    vars(self).update(
+      case      = case,
+      gop       = gop,
+      lowpower  = True,
+      profile   = profile,
+      qp        = qp,
+      quality   = quality,
+      rcmode    = "cqp",
+      slices    = slices,
+    )
+    self.latency()
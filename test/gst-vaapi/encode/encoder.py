@@ -107,7 +107,7 @@ class EncoderTest(slash.Test):
   def before(self):
     self.refctx = []
 
-  def encode(self):
+  def call_encode(self, env = ""):
     self.mprofile = mapprofile(self.codec, self.profile)
     if self.mprofile is None:
       slash.skip_test("{profile} profile is not supported".format(**vars(self)))
@@ -125,33 +125,41 @@ class EncoderTest(slash.Test):
     oopts = self.gen_output_opts()
 
     self.output = call(
-      "gst-launch-1.0 -vf"
-      " {iopts} ! {oopts}".format(iopts = iopts, oopts = oopts)
+      "env {env} gst-launch-1.0 -vf"
+      " {iopts} ! {oopts}".format(env = env, iopts = iopts, oopts = oopts)
     )
 
+  def encode(self):
+    self.call_encode()
     self.check_bitrate()
     self.check_metrics()
 
+  # per-frame encode latency (see latency metric)
+  def latency(self):
+    self.call_encode("GST_TRACERS=latency GST_DEBUG=GST_TRACER:7")
+    check_metric(
+      metric = dict(type = "latency"), output = self.output,
+      refctx = self.refctx)
+
   def check_metrics(self):
-    self.decoded = get_media()._test_artifact(
+    self.decoded = get_media()._stream_artifact(
       "{}-{width}x{height}-{format}.yuv".format(self.gen_name(), **vars(self)))
 
-    call(
+    params = dict(
+      metric = dict(type = "psnr"), reference = self.source,
+      decoded = self.decoded, width = self.width, height = self.height,
+      frames = self.frames, format = self.format, refctx = self.refctx)
+    stream = stream_metric(**params)
+
+    call_stream(
       "gst-launch-1.0 -vf filesrc location={encoded}"
       " ! {gstdecoder}"
       " ! videoconvert ! video/x-raw,format={mformatu}"
-      " ! checksumsink2 file-checksum=false frame-checksum=false"
-      " plane-checksum=false dump-output=true qos=false"
-      " dump-location={decoded}".format(**vars(self))
-    )
+      " ! checksumsink2 file-checksum=false qos=false"
+      " frame-checksum=false plane-checksum=false dump-output=true"
+      " dump-location=/dev/fd/3".format(**vars(self)), stream, fd = 3)
 
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.source, self.decoded,
-        self.width, self.height,
-        self.frames, self.format),
-      context = self.refctx,
-    )
+    check_metric(stream = stream, **params)
 
   def check_bitrate(self):
     if "cbr" == self.rcmode:
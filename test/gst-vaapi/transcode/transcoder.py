@@ -178,13 +178,15 @@ class TranscoderTest(slash.Test):
         opts += " ! {}".format(encoder)
         opts += " ! filesink location={} transcoder.".format(ofile)
 
-    # dump decoded source to yuv for reference comparison
-    self.srcyuv = get_media()._test_artifact(
-      "src_{case}.yuv".format(**vars(self)))
-    opts += " ! queue ! videoconvert ! video/x-raw,format=I420"
-    opts += " ! checksumsink2 file-checksum=false qos=false"
-    opts += " frame-checksum=false plane-checksum=false dump-output=true"
-    opts += " dump-location={srcyuv}"
+    # dump decoded source to yuv for reference comparison, unless an earlier
+    # test already decoded it the same way (see lib/sources.py)
+    self.srcyuv, self.srcdump = get_media().source_cache.lookup(
+      "gst-launch-1.0", self.gen_input_opts(), self.source, self.frames)
+    if self.srcdump is not None:
+      opts += " ! queue ! videoconvert ! video/x-raw,format=I420"
+      opts += " ! checksumsink2 file-checksum=false qos=false"
+      opts += " frame-checksum=false plane-checksum=false dump-output=true"
+      opts += " dump-location={srcdump}"
 
     return opts.format(**vars(self))
 
@@ -195,30 +197,45 @@ class TranscoderTest(slash.Test):
 
     get_media().test_call_timeout = vars(self).get("call_timeout", 0)
 
-    call("gst-launch-1.0 -vf {} {}".format(iopts, oopts))
+    try:
+      call("gst-launch-1.0 -vf {} {}".format(iopts, oopts))
+      get_media().source_cache.commit(self.srcdump, self.srcyuv)
+    finally:
+      get_media().source_cache.discard(self.srcdump)
+    get_media()._cached_artifact(
+      self.srcyuv, "src_{case}.yuv".format(**vars(self)))
 
+    # decode all outputs concurrently, each streamed into its own metric
+    jobs, checks = list(), list()
     for n, output in enumerate(self.outputs):
       for channel in xrange(output.get("channels", 1)):
         encoded = self.goutputs[n][channel]
-        yuv = get_media()._test_artifact(
+        yuv = get_media()._stream_artifact(
           "{}_{}_{}.yuv".format(self.case, n, channel))
+        stream = stream_metric(
+          metric = dict(type = "psnr"), reference = self.srcyuv,
+          decoded = yuv, width = self.width, height = self.height,
+          frames = self.frames, format = "I420")
         vppscale = self.get_vpp_scale(self.width, self.height, "hw")
-        call(
+        jobs.append((
           "gst-launch-1.0 -vf filesrc location={}"
           " ! {} ! {}"
           " ! videoconvert ! video/x-raw,format=I420"
           " ! checksumsink2 file-checksum=false qos=false"
           " frame-checksum=false plane-checksum=false dump-output=true"
-          " dump-location={}".format(
-            encoded, self.get_decoder(output["codec"], "hw"), vppscale, yuv))
-        self.check_metrics(yuv, refctx = [(n, channel)])
-        get_media()._purge_test_artifact(yuv)
-
-  def check_metrics(self, yuv, refctx):
-    get_media().baseline.check_psnr(
-      psnr = calculate_psnr(
-        self.srcyuv, yuv,
-        self.width, self.height,
-        self.frames),
-      context = self.refctx + refctx,
+          " dump-location=/dev/fd/3".format(
+            encoded, self.get_decoder(output["codec"], "hw"), vppscale),
+          stream))
+        checks.append((stream, [(n, channel)], yuv))
+
+    call_stream_all(jobs, fd = 3)
+
+    for stream, refctx, yuv in checks:
+      self.check_metrics(stream, refctx = refctx)
+      get_media()._purge_test_artifact(yuv)
+
+  def check_metrics(self, stream, refctx):
+    check_metric(
+      metric = dict(type = "psnr"), stream = stream,
+      refctx = self.refctx + refctx,
     )
@@ -4,75 +4,76 @@
 ### SPDX-License-Identifier: BSD-3-Clause
 ###
 
-from ...lib.common import memoize, try_call
+from ...lib.capabilities import gst_features, which
+from ...lib.common import memoize
 
 @memoize
 def have_gst():
-  return try_call("which gst-launch-1.0") and try_call("which gst-inspect-1.0")
+  return which("gst-launch-1.0") is not None and which("gst-inspect-1.0") is not None
 
 @memoize
 def have_gst_vaapi():
-  return try_call("gst-inspect-1.0 vaapi")
+  return "vaapi" in gst_features()
 
 @memoize
 def have_gst_vaapih264dec():
-  return try_call("gst-inspect-1.0 vaapih264dec")
+  return "vaapih264dec" in gst_features()
 
 @memoize
 def have_gst_vaapih265dec():
-  return try_call("gst-inspect-1.0 vaapih265dec")
+  return "vaapih265dec" in gst_features()
 
 @memoize
 def have_gst_vaapijpegdec():
-  return try_call("gst-inspect-1.0 vaapijpegdec")
+  return "vaapijpegdec" in gst_features()
 
 @memoize
 def have_gst_vaapimpeg2dec():
-  return try_call("gst-inspect-1.0 vaapimpeg2dec")
+  return "vaapimpeg2dec" in gst_features()
 
 @memoize
 def have_gst_vaapivc1dec():
-  return try_call("gst-inspect-1.0 vaapivc1dec")
+  return "vaapivc1dec" in gst_features()
 
 @memoize
 def have_gst_vaapivp8dec():
-  return try_call("gst-inspect-1.0 vaapivp8dec")
+  return "vaapivp8dec" in gst_features()
 
 @memoize
 def have_gst_vaapivp9dec():
-  return try_call("gst-inspect-1.0 vaapivp9dec")
+  return "vaapivp9dec" in gst_features()
 
 @memoize
 def have_gst_vaapih264enc():
-  return try_call("gst-inspect-1.0 vaapih264enc")
+  return "vaapih264enc" in gst_features()
 
 @memoize
 def have_gst_vaapih265enc():
-  return try_call("gst-inspect-1.0 vaapih265enc")
+  return "vaapih265enc" in gst_features()
 
 @memoize
 def have_gst_vaapijpegenc():
-  return try_call("gst-inspect-1.0 vaapijpegenc")
+  return "vaapijpegenc" in gst_features()
 
 @memoize
 def have_gst_vaapimpeg2enc():
-  return try_call("gst-inspect-1.0 vaapimpeg2enc")
+  return "vaapimpeg2enc" in gst_features()
 
 @memoize
 def have_gst_vaapivc1enc():
-  return try_call("gst-inspect-1.0 vaapivc1enc")
+  return "vaapivc1enc" in gst_features()
 
 @memoize
 def have_gst_vaapivp8enc():
-  return try_call("gst-inspect-1.0 vaapivp8enc")
+  return "vaapivp8enc" in gst_features()
 
 @memoize
 def have_gst_vaapipostproc():
-  return try_call("gst-inspect-1.0 vaapipostproc")
+  return "vaapipostproc" in gst_features()
 
 @memoize
 def have_gst_element(element):
-  result = try_call("gst-inspect-1.0 {}".format(element))
+  result = element in gst_features()
   return result, element
 
 @memoize
@@ -175,10 +176,11 @@ def mapprofile(codec, profile):
 
 def load_test_spec(*ctx):
   from ...lib import get_media
+  from ...lib.assets import TestSpec
   import copy
 
   # get copy of general ctx entries
-  spec = copy.deepcopy(get_media()._get_test_spec(*ctx))
+  spec = TestSpec(copy.deepcopy(get_media()._get_test_spec(*ctx)))
 
   # component specific entries override general ctx entries
   spec.update(get_media()._get_test_spec("gst-vaapi", *ctx))
@@ -0,0 +1,112 @@
+###
+### Copyright (C) 2018-2019 Intel Corporation
+###
+### SPDX-License-Identifier: BSD-3-Clause
+###
+
+from ...lib import *
+from ...lib.common import memoize
+import numpy
+
+# Numerical equivalence of the stacked SSIM/PSNR kernels (lib/metrics.py) with
+# the per-frame, per-plane skimage computations they replaced, so that neither
+# kernel drifts from the existing baselines.
+
+@memoize
+def have_skimage():
+  try:
+    import skimage.measure
+  except ImportError:
+    return False
+  return True
+
+def skimage_ssim(a, b):
+  import skimage.measure
+  if a is None or b is None: # handle Y800 case
+    return 1.0
+  return skimage.measure.compare_ssim(a, b, multichannel = True, win_size = 3)
+
+def skimage_psnr(a, b):
+  import skimage.measure
+  if a is None or b is None: # handle Y800 case
+    return 100
+  if (a == b).all():
+    return 100
+  return skimage.measure.compare_psnr(a, b)
+
+@slash.requires(have_skimage)
+class equivalence(slash.Test):
+  width   = 176
+  height  = 144
+  frames  = 4
+
+  def reference(self, compare, filename1, filename2):
+    results = list()
+    reader = FrameReaders[self.format]
+    with MappedFile(filename1) as fd1, MappedFile(filename2) as fd2:
+      for i in xrange(self.frames):
+        planes1 = reader(fd1, self.width, self.height)
+        planes2 = reader(fd2, self.width, self.height)
+        results.append([compare(a, b) for a, b in zip(planes1, planes2)])
+    results = zip(*results)
+    return tuple(map(min, results) + [sum(r) / self.frames for r in results])
+
+  def check(self, filename1, filename2):
+    for metric, calculate, compare in [
+        ("ssim", calculate_ssim, skimage_ssim),
+        ("psnr", calculate_psnr, skimage_psnr)]:
+      actual = calculate(
+        filename1, filename2, self.width, self.height, self.frames,
+        self.format)
+      expect = self.reference(compare, filename1, filename2)
+      get_media()._set_test_details(**{
+        "{}:expect".format(metric) : expect,
+        "{}:actual".format(metric) : actual})
+      assert numpy.allclose(actual, expect, rtol = 0, atol = 1e-6), (
+        "{} differs from skimage".format(metric))
+
+  def write(self, name, frames):
+    filename = get_media()._test_artifact(
+      "{}_{}.yuv".format(name, self.format))
+    with open(filename, "wb") as fd:
+      for frame in frames:
+        fd.write(frame.tobytes())
+    return filename
+
+  @slash.parametrize(("format"), sorted(FrameReaders.keys()))
+  def test_random(self, format):
+    self.format = format
+    framesize = get_framesize(self.width, self.height, format)
+    rng = numpy.random.RandomState(0)
+
+    # a reference and a distorted copy with ~10% of the bytes changed
+    frames1 = [
+      rng.randint(0, 256, framesize).astype(numpy.uint8)
+        for i in xrange(self.frames)]
+    frames2 = list()
+    for frame in frames1:
+      frame = frame.copy()
+      mask = rng.random_sample(framesize) < 0.1
+      frame[mask] = rng.randint(0, 256, mask.sum())
+      frames2.append(frame)
+
+    self.check(self.write("random1", frames1), self.write("random2", frames2))
+
+  @slash.parametrize(("format"), sorted(FrameReaders.keys()))
+  def test_real(self, format):
+    self.format = format
+    framesize = get_framesize(self.width, self.height, format)
+
+    # Consecutive frames of a real clip, so both files carry natural content
+    # and realistic differences.  Each frame is laid out from the bytes of one
+    # NV12 frame (repeated to the frame size of format), so the luma plane of
+    # the 8 bit planar formats is exactly the clip's luma.
+    source = os.path.join(get_media().mypath, "assets", "yuv", "QCIF_NV12.yuv")
+    get_media().assets.require(source)
+    nv12size = get_framesize(self.width, self.height, "NV12")
+    with MappedFile(source) as fd:
+      clip = [
+        numpy.resize(fd.read(numpy.uint8, nv12size), framesize)
+          for i in xrange(self.frames + 1)]
+
+    self.check(self.write("real1", clip[:-1]), self.write("real2", clip[1:]))